@@ -24,6 +24,7 @@ export class ChatTablesConstruct extends Construct {
 
   public readonly byUserIdIndex: string = "byUserId";
   public readonly bySessionIdIndex: string = "bySessionId";
+  public readonly bySessionIdTimestampIndex: string = "bySessionIdTimestamp";
   public readonly byTimestampIndex: string = "byTimestamp";
 
   constructor(scope: Construct, id: string) {
@@ -80,6 +81,13 @@ export class ChatTablesConstruct extends Construct {
       indexName: this.bySessionIdIndex,
       partitionKey: { name: "sessionId", type: dynamodb.AttributeType.STRING },
     });
+    // Lets the chat lambda read the newest messages of a session first
+    messagesTable.addGlobalSecondaryIndex({
+      indexName: this.bySessionIdTimestampIndex,
+      partitionKey: sessionIdAttr,
+      sortKey: timestampAttr,
+      projectionType: dynamodb.ProjectionType.ALL,
+    });
 
     const promptTable = new DynamoDBTable(this, "Prompt", groupNameAttr2, sortKeyAttr).table;
     const intentionTable = new DynamoDBTable(this, "Intention", groupNameAttr, intentionIdAttr).table;
@@ -49,6 +49,26 @@ resp_header = {
 }
 
 
+def mark_chatbot_updated(group_name, chatbot_id):
+    """Bump the updateTime of a chatbot once all its items are written.
+
+    The online lambdas cache resolved chatbot configs and compare this
+    attribute to decide whether their cached copy is stale.
+
+    Args:
+        group_name: User group name
+        chatbot_id: Chatbot id
+    """
+    chatbot_table.update_item(
+        Key={"groupName": group_name, "chatbotId": chatbot_id},
+        UpdateExpression="SET #updateTime = :updateTime",
+        ExpressionAttributeNames={"#updateTime": "updateTime"},
+        ExpressionAttributeValues={
+            ":updateTime": str(datetime.now(timezone.utc))
+        },
+    )
+
+
 def create_chatbot(event, group_name):
     """Create a new chatbot with associated embedding, rerank, and VLM models.
 
@@ -198,6 +218,9 @@ def create_chatbot(event, group_name):
                 }
             )
 
+    if index:
+        mark_chatbot_updated(group_name, chatbot_id)
+
     return {
         "groupName": group_name,
         "chatbotId": chatbot_id,
@@ -562,6 +585,9 @@ def edit_chatbot(event, group_name):
                 create_time=update_time,
             )
 
+    if index:
+        mark_chatbot_updated(group_name, chatbot_id)
+
     return {
         "chatbotId": chatbot_id,
         "groupName": group_name,
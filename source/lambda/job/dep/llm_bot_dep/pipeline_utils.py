@@ -0,0 +1,174 @@
+"""
+Staged producer/consumer pipeline used by the Glue ingestion job
+"""
+
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, List
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class _FileState:
+    """Bookkeeping of one source file moving through the pipeline."""
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.extracted = False
+        self.pending_batches = 0
+        self.error = None
+
+    @property
+    def finished(self) -> bool:
+        return self.error is not None or (
+            self.extracted and self.pending_batches == 0
+        )
+
+
+class StagedIngestionPipeline:
+    """Overlap extraction, embedding and indexing of source files.
+
+    Each stage runs in its own bounded thread pool. A file is extracted into
+    batches of chunks, every batch is embedded and then indexed. The number
+    of batches extracted but not yet indexed is capped by
+    ``max_pending_batches``: once reached, no new file is extracted until
+    the embedding and indexing stages catch up.
+
+    All the callbacks passed to ``on_status`` run in the calling thread, so
+    the status of a file is reported once, after its last batch is indexed
+    or as soon as one of its stages fails.
+
+    Args:
+        extract_fn (Callable): turns a file into a list of batches
+        embed_fn (Callable): embeds a batch, the result is passed to index_fn
+        index_fn (Callable): writes an embedded batch to the index
+        on_status (Callable): called with (item, status, detail) where status
+            is "COMPLETED" or "FAILED"
+        extraction_workers (int): concurrent file extractions
+        embedding_workers (int): concurrent embedding requests
+        indexing_workers (int): concurrent bulk index requests
+        max_pending_batches (int): bound of batches waiting in the pipeline
+        extract_only (bool): skip the embedding and indexing stages
+    """
+
+    def __init__(
+        self,
+        extract_fn: Callable[[Any], List[Any]],
+        embed_fn: Callable[[Any], Any],
+        index_fn: Callable[[Any], None],
+        on_status: Callable[[Any, str, str], None],
+        extraction_workers: int = 2,
+        embedding_workers: int = 4,
+        indexing_workers: int = 2,
+        max_pending_batches: int = 64,
+        extract_only: bool = False,
+    ):
+        self.extract_fn = extract_fn
+        self.embed_fn = embed_fn
+        self.index_fn = index_fn
+        self.on_status = on_status
+        self.extraction_workers = extraction_workers
+        self.embedding_workers = embedding_workers
+        self.indexing_workers = indexing_workers
+        self.max_pending_batches = max_pending_batches
+        self.extract_only = extract_only
+
+    def run(self, items: Iterable[Any]) -> None:
+        items = iter(items)
+        no_more_items = False
+        # future -> (stage, file state, stage input)
+        running = {}
+        # batches waiting for a free embedding worker
+        waiting_batches = deque()
+        pending_batches = 0
+
+        with ThreadPoolExecutor(
+            self.extraction_workers, thread_name_prefix="extract"
+        ) as extraction_pool, ThreadPoolExecutor(
+            self.embedding_workers, thread_name_prefix="embed"
+        ) as embedding_pool, ThreadPoolExecutor(
+            self.indexing_workers, thread_name_prefix="index"
+        ) as indexing_pool:
+
+            def running_count(stage):
+                return sum(1 for v in running.values() if v[0] == stage)
+
+            while True:
+                # start new extractions unless the later stages lag behind
+                while (
+                    not no_more_items
+                    and pending_batches < self.max_pending_batches
+                    and running_count("extract") < self.extraction_workers
+                ):
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        no_more_items = True
+                        break
+                    file_state = _FileState(item)
+                    future = extraction_pool.submit(self.extract_fn, item)
+                    running[future] = ("extract", file_state, None)
+
+                while (
+                    waiting_batches
+                    and running_count("embed") < self.embedding_workers
+                ):
+                    file_state, batch = waiting_batches.popleft()
+                    if file_state.error is not None:
+                        pending_batches -= 1
+                        continue
+                    future = embedding_pool.submit(self.embed_fn, batch)
+                    running[future] = ("embed", file_state, batch)
+
+                if not running:
+                    break
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, file_state, _ = running.pop(future)
+                    was_finished = file_state.finished
+                    error = future.exception()
+                    if error is not None:
+                        if stage != "extract":
+                            file_state.pending_batches -= 1
+                            pending_batches -= 1
+                        if file_state.error is None:
+                            file_state.error = error
+                            logger.error(
+                                "Error in %s stage of %s: %s",
+                                stage,
+                                file_state.item,
+                                error,
+                            )
+                    elif stage == "extract":
+                        batches = [batch for batch in future.result() if batch]
+                        file_state.extracted = True
+                        if not self.extract_only:
+                            file_state.pending_batches += len(batches)
+                            pending_batches += len(batches)
+                            waiting_batches.extend(
+                                (file_state, batch) for batch in batches
+                            )
+                    elif stage == "embed":
+                        if file_state.error is None:
+                            new_future = indexing_pool.submit(
+                                self.index_fn, future.result()
+                            )
+                            running[new_future] = ("index", file_state, None)
+                        else:
+                            file_state.pending_batches -= 1
+                            pending_batches -= 1
+                    else:
+                        file_state.pending_batches -= 1
+                        pending_batches -= 1
+
+                    if file_state.finished and not was_finished:
+                        self._report(file_state)
+
+    def _report(self, file_state: _FileState):
+        if file_state.error is None:
+            self.on_status(file_state.item, "COMPLETED", "")
+        else:
+            self.on_status(file_state.item, "FAILED", str(file_state.error))
@@ -161,8 +161,19 @@ def parse_string_to_xml_node(xml_string):
         return None
 
 
+HEADING_PATTERN = re.compile(r"\s*(#+)(.*)")
+
+
 def extract_headings(md_content: str):
     """Extract heading hierarchy from Markdown content.
+
+    The hierarchy is built in one pass. A stack holds the open headings with
+    strictly increasing levels, so after popping the headings whose level is
+    not below the current one, the top is the last heading with a lower
+    level, which is the parent find_parent returns. The last heading seen per
+    level gives previous and next, children are appended to their parent
+    when the level is one below the child's.
+
     Args:
         md_content (str): Markdown content.
     Returns:
@@ -170,36 +181,45 @@ def extract_headings(md_content: str):
     """
     header_index = 0
     headers = {}
-    lines = md_content.split("\n")
     id_index_dict = {}
-    for line in lines:
-        match = re.match(r"\s*(#+)(.*)", line)
+    stack = []
+    last_id_by_level = {}
+    children = {}
+    next_ids = {}
+    for line in md_content.split("\n"):
+        match = HEADING_PATTERN.match(line)
         if match:
             header_index += 1
-            # print(match.group)
             level = len(match.group(1))
             title = match.group(2).strip()
             id_prefix = str(uuid.uuid4())[:8]
             _id = f"${header_index}-{id_prefix}"
-            parent = find_parent(headers, level)
-            previous = find_previous_with_same_level(headers, level)
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            parent = stack[-1][1] if stack else None
+            previous = last_id_by_level.get(level)
             headers[_id] = {
                 "title": title,
                 "level": level,
                 "parent": parent,
                 "previous": previous,
             }
+            children[_id] = []
+            if parent is not None and stack[-1][0] == level - 1:
+                children[parent].append(_id)
+            if previous is not None:
+                next_ids[previous] = _id
+            stack.append((level, _id))
+            last_id_by_level[level] = _id
             # Use list in case multiple heading have the same title
             if title not in id_index_dict:
                 id_index_dict[title] = [_id]
             else:
                 id_index_dict[title].append(_id)
 
-    for header_obj in headers:
-        headers[header_obj]["child"] = find_child(headers, header_obj)
-        headers[header_obj]["next"] = find_next_with_same_level(
-            headers, header_obj
-        )
+    for _id, header in headers.items():
+        header["child"] = children[_id]
+        header["next"] = next_ids.get(_id)
 
     return headers, id_index_dict
 
@@ -5,6 +5,9 @@ Helper functions for storage intermediate content or log
 import datetime
 import json
 import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 from urllib.parse import urlparse
 from botocore.exceptions import ClientError
 
@@ -70,13 +73,186 @@ def save_content_to_s3(s3, document: Document, res_bucket: str, splitting_type:
     """
     logger_file = convert_to_logger(document)
     # Extract the filename from the file_path in the metadata
-    file_path = document.metadata.get("file_path", "")
-    # filename = file_path.split('/')[-1].split('.')[0]
-    filename = file_path.replace("s3://", "").replace("/", "-").replace(".", "-")
+    filename = get_archive_prefix(document)
     # RecursiveCharacterTextSplitter have been rewrite to split based on chunk size & overlap, use separate folder to store the logger file
     upload_chunk_to_s3(s3, logger_file, res_bucket, filename, splitting_type)
 
 
+def get_archive_prefix(document: Document) -> str:
+    """Prefix of the archived content of the source file of a document"""
+    file_path = document.metadata.get("file_path", "")
+    return file_path.replace("s3://", "").replace("/", "-").replace(".", "-")
+
+
+class ChunkArchiveWriter:
+    """Archive documents in JSONL parts instead of one object per document.
+
+    Documents are grouped by source file and splitting type, and every
+    group is written as parts of at most ``part_max_bytes`` bytes, uploaded
+    concurrently, plus a manifest listing the parts:
+
+        filename A
+        ├── chunk-size-splitting
+        │   ├── timestamp 1
+        │   │   ├── <archive id>-part-00000.jsonl
+        │   │   ├── <archive id>-part-00001.jsonl
+        │   │   ├── <archive id>-manifest.json
+
+    Each line of a part is {"page_content": ..., "metadata": ...}. Use
+    iter_archived_documents to read the archive back.
+
+    Usage:
+        with ChunkArchiveWriter(s3, res_bucket) as archive:
+            archive.add(document, SplittingType.CHUNK.value)
+    """
+
+    def __init__(
+        self,
+        s3,
+        res_bucket: str,
+        part_max_bytes: int = 8 * 1024 * 1024,
+        max_workers: int = 4,
+    ):
+        self.s3 = s3
+        self.res_bucket = res_bucket
+        self.part_max_bytes = part_max_bytes
+        self.archive_id = uuid.uuid4().hex
+        # round the timestamp to hours to avoid too many folders
+        self.timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H")
+        self._executor = ThreadPoolExecutor(max_workers)
+        self._groups = {}
+
+    def _get_group(self, prefix: str, splitting_type: str) -> dict:
+        key = (prefix, splitting_type)
+        if key not in self._groups:
+            self._groups[key] = {
+                "lines": [],
+                "size": 0,
+                "parts": [],
+                "document_count": 0,
+                "uploads": [],
+            }
+        return self._groups[key]
+
+    def _flush_group(self, prefix: str, splitting_type: str, group: dict):
+        if not group["lines"]:
+            return
+        object_key = (
+            f"{prefix}/{splitting_type}/{self.timestamp}/"
+            f"{self.archive_id}-part-{len(group['parts']):05d}.jsonl"
+        )
+        body = "\n".join(group["lines"]).encode("utf-8")
+        group["parts"].append(
+            {"key": object_key, "document_count": len(group["lines"])}
+        )
+        group["uploads"].append(
+            self._executor.submit(
+                self.s3.put_object,
+                Bucket=self.res_bucket,
+                Key=object_key,
+                Body=body,
+            )
+        )
+        group["lines"] = []
+        group["size"] = 0
+
+    def add(self, document: Document, splitting_type: str):
+        prefix = get_archive_prefix(document)
+        group = self._get_group(prefix, splitting_type)
+        line = json.dumps(
+            {"page_content": document.page_content, "metadata": document.metadata},
+            ensure_ascii=False,
+        )
+        group["lines"].append(line)
+        group["size"] += len(line.encode("utf-8")) + 1
+        group["document_count"] += 1
+        if group["size"] >= self.part_max_bytes:
+            self._flush_group(prefix, splitting_type, group)
+
+    def close(self):
+        """Upload the remaining parts and the manifests, then wait for them"""
+        try:
+            for (prefix, splitting_type), group in self._groups.items():
+                self._flush_group(prefix, splitting_type, group)
+                for upload in group["uploads"]:
+                    try:
+                        upload.result()
+                    except Exception as e:
+                        logger.error(f"Error uploading archive part to S3: {e}")
+                manifest = {
+                    "archive_id": self.archive_id,
+                    "splitting_type": splitting_type,
+                    "document_count": group["document_count"],
+                    "parts": group["parts"],
+                }
+                manifest_key = (
+                    f"{prefix}/{splitting_type}/{self.timestamp}/"
+                    f"{self.archive_id}-manifest.json"
+                )
+                try:
+                    self.s3.put_object(
+                        Bucket=self.res_bucket,
+                        Key=manifest_key,
+                        Body=json.dumps(manifest, ensure_ascii=False),
+                    )
+                except Exception as e:
+                    logger.error(f"Error uploading archive manifest to S3: {e}")
+        finally:
+            self._groups = {}
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _parse_logger_content(logger_content: str) -> Document:
+    """Inverse of convert_to_logger, for objects archived one per document"""
+    page_content, _, metadata = logger_content.rpartition("\nMetadata: ")
+    return Document(
+        page_content=page_content[len("Page Content: \n"):],
+        metadata=json.loads(metadata),
+    )
+
+
+def iter_archived_documents(
+    s3, bucket: str, prefix: str, splitting_type: str
+) -> Iterator[Document]:
+    """Read back the documents archived for a source file.
+
+    Supports both the JSONL parts listed by the manifests of
+    ChunkArchiveWriter and the former one-object-per-document .log files.
+
+    Args:
+        prefix (str): archive prefix of the source file, see get_archive_prefix
+        splitting_type (str): value of SplittingType
+    """
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket, Prefix=f"{prefix}/{splitting_type}/"
+    ):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if key.endswith("-manifest.json"):
+                manifest = json.loads(
+                    s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+                )
+                for part in manifest["parts"]:
+                    body = s3.get_object(Bucket=bucket, Key=part["key"])["Body"]
+                    for line in body.iter_lines():
+                        if line:
+                            item = json.loads(line)
+                            yield Document(
+                                page_content=item["page_content"],
+                                metadata=item["metadata"],
+                            )
+            elif key.endswith(".log"):
+                body = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+                yield _parse_logger_content(body.decode("utf-8"))
+
+
 def _s3_uri_exist(s3_client, s3_uri: str) -> bool:
     """Checks if an object exists at a given S3 URI. 
     eg. s3://bucket/folder/file.csv
@@ -5,7 +5,7 @@ import os
 import sys
 import traceback
 from datetime import datetime, timezone
-from typing import Generator, Iterable, List
+from typing import Generator, List
 
 import boto3
 from langchain.docstore.document import Document
@@ -56,11 +56,12 @@ args = getResolvedOptions(
 from llm_bot_dep import sm_utils
 from llm_bot_dep.constant import SplittingType
 from llm_bot_dep.loaders.auto import process_object
+from llm_bot_dep.pipeline_utils import StagedIngestionPipeline
 from llm_bot_dep.schemas.processing_parameters import (
     ProcessingParameters,
     VLLMParameters,
 )
-from llm_bot_dep.storage_utils import save_content_to_s3
+from llm_bot_dep.storage_utils import ChunkArchiveWriter
 
 # Adaption to allow nougat to run in AWS Glue with writable /tmp
 os.environ["TRANSFORMERS_CACHE"] = "/tmp/transformers_cache"
@@ -95,6 +96,22 @@ index_type = args["INDEX_TYPE"]
 operation_type = args["OPERATION_TYPE"]
 aos_secret = args.get("AOS_SECRET_NAME", "opensearch-master-user")
 
+
+def get_optional_arg(name: str, default: str) -> str:
+    """Read an optional job argument, getResolvedOptions fails on absent ones"""
+    if f"--{name}" in sys.argv:
+        return getResolvedOptions(sys.argv, [name])[name]
+    return default
+
+
+# Concurrency of each ingestion pipeline stage
+extraction_workers = int(get_optional_arg("EXTRACTION_WORKERS", "2"))
+embedding_workers = int(get_optional_arg("EMBEDDING_WORKERS", "4"))
+indexing_workers = int(get_optional_arg("INDEXING_WORKERS", "2"))
+max_pending_batches = int(get_optional_arg("MAX_PENDING_BATCHES", "64"))
+# Number of chunk ids fetched per scroll page and deleted per bulk request
+delete_batch_size = int(get_optional_arg("DELETE_BATCH_SIZE", "1000"))
+
 s3_client = boto3.client("s3")
 sm_client = boto3.client("secretsmanager")
 smr_client = boto3.client("sagemaker-runtime")
@@ -285,39 +302,22 @@ class BatchChunkDocumentProcessor:
             Document: A chunk of a document.
 
         """
-        temp_text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
-        )
-        temp_content = content
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
         )
-        updated_heading_hierarchy = {}
-        for temp_document in temp_content:
-            temp_chunk_id = temp_document.metadata["chunk_id"]
-            temp_split_size = len(
-                temp_text_splitter.split_documents([temp_document])
-            )
-            # Add size in heading_hierarchy
-            if "heading_hierarchy" in temp_document.metadata:
-                temp_hierarchy = temp_document.metadata["heading_hierarchy"]
-                temp_hierarchy["size"] = temp_split_size
-                updated_heading_hierarchy[temp_chunk_id] = temp_hierarchy
-
         for document in content:
             splits = text_splitter.split_documents([document])
+            # Add size in heading_hierarchy, shared by all the splits
+            heading_hierarchy = document.metadata.get("heading_hierarchy")
+            if heading_hierarchy is not None:
+                heading_hierarchy["size"] = len(splits)
             # List of Document objects
-            index = 1
-            for split in splits:
+            for index, split in enumerate(splits, start=1):
                 chunk_id = split.metadata["chunk_id"]
-                logger.info(chunk_id)
                 split.metadata["chunk_id"] = f"{chunk_id}-{index}"
-                if chunk_id in updated_heading_hierarchy:
-                    split.metadata["heading_hierarchy"] = (
-                        updated_heading_hierarchy[chunk_id]
-                    )
-                    logger.info(split.metadata["heading_hierarchy"])
-                index += 1
+                if heading_hierarchy is not None:
+                    split.metadata["heading_hierarchy"] = heading_hierarchy
+                logger.debug(split.metadata["chunk_id"])
                 yield split
 
     def batch_generator(
@@ -353,9 +353,10 @@ class BatchQueryDocumentProcessor:
     Args:
         docsearch (OpenSearchVectorSearch): An instance of OpenSearchVectorSearch used for document search.
         batch_size (int): The size of each batch.
+        scroll (str): How long OpenSearch keeps the scroll context between pages.
 
     Methods:
-        query_documents(s3_path): Queries documents based on the given S3 path.
+        query_documents(s3_path): Streams the ids of the documents of the given S3 path.
         batch_generator(s3_path): Generates batches of document IDs based on the given S3 path.
     """
 
@@ -363,50 +364,68 @@ class BatchQueryDocumentProcessor:
         self,
         docsearch: OpenSearchVectorSearch,
         batch_size: int,
+        scroll: str = "5m",
     ):
         self.docsearch = docsearch
         self.batch_size = batch_size
+        self.scroll = scroll
 
-    def query_documents(self, s3_path) -> Iterable:
+    def query_documents(self, s3_path) -> Generator[str, None, None]:
         """
-        Queries documents based on the given S3 path.
+        Streams the ids of all the documents of the given S3 path.
+
+        The ids are read page by page with a scroll, so files with more than
+        10000 chunks are fully covered.
 
         Args:
             s3_path (str): The S3 path to query documents from.
 
-        Returns:
-            Iterable: An iterable of document IDs.
+        Yields:
+            str: A document ID.
         """
         search_body = {
             "query": {
                 # use term-level queries only for fields mapped as keyword
                 "prefix": {"metadata.file_path.keyword": {"value": s3_path}},
             },
-            "size": 10000,
-            "sort": [{"_score": {"order": "desc"}}],
-            "_source": {"excludes": ["vector_field"]},
+            "size": self.batch_size,
+            # _doc is the cheapest order to scroll in
+            "sort": ["_doc"],
+            "_source": False,
         }
 
-        if self.docsearch.client.indices.exists(
+        if not self.docsearch.client.indices.exists(
             index=self.docsearch.index_name
         ):
-            logger.info(
-                "BatchQueryDocumentProcessor: Querying documents for %s",
-                s3_path,
-            )
-            query_documents = self.docsearch.client.search(
-                index=self.docsearch.index_name, body=search_body
-            )
-            document_ids = [
-                doc["_id"] for doc in query_documents["hits"]["hits"]
-            ]
-            return document_ids
-        else:
             logger.info(
                 "BatchQueryDocumentProcessor: Index %s does not exist, skipping deletion",
                 self.docsearch.index_name,
             )
-            return []
+            return
+
+        logger.info(
+            "BatchQueryDocumentProcessor: Querying documents for %s", s3_path
+        )
+        response = self.docsearch.client.search(
+            index=self.docsearch.index_name,
+            body=search_body,
+            scroll=self.scroll,
+        )
+        scroll_id = response.get("_scroll_id")
+        try:
+            while response["hits"]["hits"]:
+                for doc in response["hits"]["hits"]:
+                    yield doc["_id"]
+                response = self.docsearch.client.scroll(
+                    scroll_id=scroll_id, scroll=self.scroll
+                )
+                scroll_id = response.get("_scroll_id", scroll_id)
+        finally:
+            if scroll_id:
+                try:
+                    self.docsearch.client.clear_scroll(scroll_id=scroll_id)
+                except Exception as e:
+                    logger.warning("Failed to clear scroll context: %s", e)
 
     def batch_generator(self, s3_path):
         """
@@ -440,7 +459,13 @@ class OpenSearchIngestionWorker:
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
     )
-    def aos_ingestion(self, documents: List[Document]) -> None:
+    def embed(self, documents: List[Document]) -> tuple:
+        """
+        Embed a batch of documents.
+
+        Returns:
+            tuple: (texts, embeddings_vectors, metadatas) for index()
+        """
         texts = [doc.page_content for doc in documents]
         metadatas = [doc.metadata for doc in documents]
         embeddings_vectors = self.docsearch.embedding_function.embed_documents(
@@ -458,34 +483,122 @@ class OpenSearchIngestionWorker:
                 metadata_list.append(metadata)
             embeddings_vectors = embeddings_vectors_list
             metadatas = metadata_list
+        return texts, embeddings_vectors, metadatas
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+    )
+    def index(self, embedded_batch: tuple) -> None:
+        texts, embeddings_vectors, metadatas = embedded_batch
         self.docsearch._OpenSearchVectorSearch__add(
             texts, embeddings_vectors, metadatas=metadatas
         )
 
+    def aos_ingestion(self, documents: List[Document]) -> None:
+        self.index(self.embed(documents))
+
 
 class OpenSearchDeleteWorker:
+    """
+    Deletes documents with large bulk requests. The deletions become visible
+    to searches after refresh(), which is called once at the end of a run.
+    """
+
     def __init__(self, docsearch: OpenSearchVectorSearch):
         self.docsearch = docsearch
         self.index_name = self.docsearch.index_name
+        self.deleted_count = 0
+        self.failed_count = 0
 
-    def aos_deletion(self, document_ids) -> None:
-        bulk_delete_requests = []
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+    )
+    def aos_deletion(self, document_ids) -> int:
+        """
+        Delete a batch of documents by id.
 
-        # Check if self.index_name exists
-        if not self.docsearch.client.indices.exists(index=self.index_name):
-            logger.info("Index %s does not exist", self.index_name)
-            return
-        else:
-            for document_id in document_ids:
-                bulk_delete_requests.append(
-                    {"delete": {"_id": document_id, "_index": self.index_name}}
+        Returns:
+            int: number of documents deleted
+        """
+        bulk_delete_requests = [
+            {"delete": {"_id": document_id, "_index": self.index_name}}
+            for document_id in document_ids
+        ]
+        response = self.docsearch.client.bulk(
+            index=self.index_name, body=bulk_delete_requests
+        )
+
+        deleted = len(document_ids)
+        if response.get("errors"):
+            failed = [
+                item["delete"]
+                for item in response.get("items", [])
+                # a chunk already gone is not a failure
+                if item["delete"].get("status", 200) >= 300
+                and item["delete"].get("status") != 404
+            ]
+            if failed:
+                logger.warning(
+                    "Failed to delete %d documents, first error: %s",
+                    len(failed),
+                    failed[0].get("error"),
                 )
+            deleted -= len(failed)
+            self.failed_count += len(failed)
+        self.deleted_count += deleted
+        return deleted
 
-            self.docsearch.client.bulk(
-                index=self.index_name, body=bulk_delete_requests, refresh=True
-            )
-            logger.info("Deleted %d documents", len(document_ids))
+    def refresh(self) -> None:
+        if self.deleted_count == 0:
             return
+        self.docsearch.client.indices.refresh(index=self.index_name)
+        logger.info(
+            "Refreshed index %s after deleting %d documents",
+            self.index_name,
+            self.deleted_count,
+        )
+
+
+def extract_batches(
+    processing_params: ProcessingParameters, batch_chunk_processor
+) -> List[List[Document]]:
+    """
+    Load a source object, split it and archive the intermediate content.
+
+    Returns:
+        List[List[Document]]: batches of chunks ready to be embedded
+    """
+    # The res is list[Document] type
+    documents = process_object(processing_params)
+    gen_chunk_flag = (
+        False if processing_params.file_type in ["csv", "xlsx", "xls"] else True
+    )
+    batches = []
+    # archive the documents and chunks of the file as a few JSONL parts
+    with ChunkArchiveWriter(
+        s3_client, processing_params.result_bucket_name
+    ) as archive_writer:
+        for document in documents:
+            archive_writer.add(document, SplittingType.SEMANTIC.value)
+
+        for batch in batch_chunk_processor.batch_generator(
+            documents, gen_chunk_flag
+        ):
+            if len(batch) == 0:
+                continue
+
+            for document in batch:
+                if "complete_heading" in document.metadata:
+                    document.page_content = (
+                        document.metadata["complete_heading"]
+                        + " "
+                        + document.page_content
+                    )
+                archive_writer.add(document, SplittingType.CHUNK.value)
+            batches.append(batch)
+    return batches
 
 
 def ingestion_pipeline(
@@ -494,79 +607,71 @@ def ingestion_pipeline(
     ingestion_worker,
     extract_only=False,
 ):
-    for processing_params in s3_files_iterator:
-        try:
-            # The res is list[Document] type
-            documents = process_object(processing_params)
-            for document in documents:
-                save_content_to_s3(
-                    s3_client,
-                    document,
-                    processing_params.result_bucket_name,
-                    SplittingType.SEMANTIC.value,
-                )
-
-            gen_chunk_flag = (
-                False
-                if processing_params.file_type in ["csv", "xlsx", "xls"]
-                else True
-            )
-            batches = batch_chunk_processor.batch_generator(
-                documents, gen_chunk_flag
-            )
-
-            for batch in batches:
-                if len(batch) == 0:
-                    continue
-
-                for document in batch:
-                    if "complete_heading" in document.metadata:
-                        document.page_content = (
-                            document.metadata["complete_heading"]
-                            + " "
-                            + document.page_content
-                        )
-                    else:
-                        document.page_content = document.page_content
-
-                    save_content_to_s3(
-                        s3_client,
-                        document,
-                        processing_params.result_bucket_name,
-                        SplittingType.CHUNK.value,
-                    )
+    """
+    Ingest the source objects with separate worker pools for extraction,
+    embedding and indexing, so the three stages overlap across files.
+    """
 
-                if not extract_only:
-                    ingestion_worker.aos_ingestion(batch)
-            update_etl_object_table(processing_params, "COMPLETED")
-        except Exception as e:
+    def on_status(processing_params, status, detail):
+        if status == "FAILED":
             logger.error(
                 "Error processing object %s: %s",
                 f"{processing_params.source_bucket_name}/{processing_params.source_object_key}",
-                e,
+                detail,
             )
-            update_etl_object_table(processing_params, "FAILED", str(e))
-            traceback.print_exc()
+        update_etl_object_table(processing_params, status, detail)
+
+    pipeline = StagedIngestionPipeline(
+        extract_fn=lambda processing_params: extract_batches(
+            processing_params, batch_chunk_processor
+        ),
+        embed_fn=ingestion_worker.embed,
+        index_fn=ingestion_worker.index,
+        on_status=on_status,
+        extraction_workers=extraction_workers,
+        embedding_workers=embedding_workers,
+        indexing_workers=indexing_workers,
+        max_pending_batches=max_pending_batches,
+        extract_only=extract_only,
+    )
+    pipeline.run(s3_files_iterator)
 
 
 def delete_pipeline(s3_files_iterator, document_generator, delete_worker):
-    for processing_params in s3_files_iterator:
-        try:
+    """
+    Delete the chunks of every source object, the index is refreshed once
+    after all the objects are processed.
+    """
+    try:
+        for processing_params in s3_files_iterator:
             s3_path = f"s3://{processing_params.source_bucket_name}/{processing_params.source_object_key}"
-
-            batches = document_generator.batch_generator(s3_path)
-            for batch in batches:
-                if len(batch) == 0:
-                    continue
-                delete_worker.aos_deletion(batch)
-
-        except Exception as e:
-            logger.error(
-                "Error processing object %s: %s",
-                f"{processing_params.source_bucket_name}/{processing_params.source_object_key}",
-                e,
-            )
-            traceback.print_exc()
+            file_deleted = 0
+            try:
+                batches = document_generator.batch_generator(s3_path)
+                for batch in batches:
+                    if len(batch) == 0:
+                        continue
+                    file_deleted += delete_worker.aos_deletion(batch)
+                    logger.info(
+                        "Deleted %d documents of %s so far, %d in total",
+                        file_deleted,
+                        s3_path,
+                        delete_worker.deleted_count,
+                    )
+            except Exception as e:
+                logger.error(
+                    "Error processing object %s: %s",
+                    f"{processing_params.source_bucket_name}/{processing_params.source_object_key}",
+                    e,
+                )
+                traceback.print_exc()
+    finally:
+        delete_worker.refresh()
+    logger.info(
+        "Deletion finished: %d documents deleted, %d failed",
+        delete_worker.deleted_count,
+        delete_worker.failed_count,
+    )
 
 
 def create_processors_and_workers(
@@ -598,7 +703,9 @@ def create_processors_and_workers(
         s3_files_iterator = file_iterator.iterate_s3_files(
             extract_content=False
         )
-        batch_processor = BatchQueryDocumentProcessor(docsearch, batch_size=10)
+        batch_processor = BatchQueryDocumentProcessor(
+            docsearch, batch_size=delete_batch_size
+        )
         worker = OpenSearchDeleteWorker(docsearch)
     else:
         raise ValueError(
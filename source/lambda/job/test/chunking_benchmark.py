@@ -0,0 +1,149 @@
+"""
+Micro-benchmark of the chunking step of the Glue job: the former two-pass
+chunk_generator (count splits, then split again) against the single-pass
+BatchChunkDocumentProcessor.chunk_generator of glue-job-script.py, over
+generated markdown sections with and without heading hierarchies.
+
+The class is loaded from the Glue script without running the job, which
+parses the Glue arguments at import.
+
+Usage: python chunking_benchmark.py [section_number]
+"""
+import ast
+import logging
+import os
+import random
+import sys
+import time
+from typing import Generator, List
+
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+CHUNK_SIZE = 1024
+CHUNK_OVERLAP = 30
+GLUE_JOB_SCRIPT = os.path.join(os.path.dirname(__file__), "../glue-job-script.py")
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+def load_processor_class():
+    with open(GLUE_JOB_SCRIPT) as f:
+        tree = ast.parse(f.read())
+    class_node = next(
+        node
+        for node in tree.body
+        if isinstance(node, ast.ClassDef)
+        and node.name == "BatchChunkDocumentProcessor"
+    )
+    namespace = {
+        "Document": Document,
+        "Generator": Generator,
+        "List": List,
+        "RecursiveCharacterTextSplitter": RecursiveCharacterTextSplitter,
+        "logger": logger,
+    }
+    module = ast.Module(body=[class_node], type_ignores=[])
+    exec(compile(module, GLUE_JOB_SCRIPT, "exec"), namespace)
+    return namespace["BatchChunkDocumentProcessor"]
+
+
+BatchChunkDocumentProcessor = load_processor_class()
+
+
+class LegacyBatchChunkDocumentProcessor(BatchChunkDocumentProcessor):
+    """chunk_generator as it was before splitting each document once"""
+
+    def chunk_generator(
+        self, content: List[Document]
+    ) -> Generator[Document, None, None]:
+        temp_text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
+        )
+        temp_content = content
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
+        )
+        updated_heading_hierarchy = {}
+        for temp_document in temp_content:
+            temp_chunk_id = temp_document.metadata["chunk_id"]
+            temp_split_size = len(
+                temp_text_splitter.split_documents([temp_document])
+            )
+            # Add size in heading_hierarchy
+            if "heading_hierarchy" in temp_document.metadata:
+                temp_hierarchy = temp_document.metadata["heading_hierarchy"]
+                temp_hierarchy["size"] = temp_split_size
+                updated_heading_hierarchy[temp_chunk_id] = temp_hierarchy
+
+        for document in content:
+            splits = text_splitter.split_documents([document])
+            # List of Document objects
+            index = 1
+            for split in splits:
+                chunk_id = split.metadata["chunk_id"]
+                logger.info(chunk_id)
+                split.metadata["chunk_id"] = f"{chunk_id}-{index}"
+                if chunk_id in updated_heading_hierarchy:
+                    split.metadata["heading_hierarchy"] = (
+                        updated_heading_hierarchy[chunk_id]
+                    )
+                    logger.info(split.metadata["heading_hierarchy"])
+                index += 1
+                yield split
+
+
+def generate_sections(section_number: int):
+    random.seed(0)
+    words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur"]
+    sections = []
+    for i in range(section_number):
+        paragraph_number = random.randint(1, 20)
+        text = "\n\n".join(
+            " ".join(random.choices(words, k=random.randint(20, 200)))
+            for _ in range(paragraph_number)
+        )
+        metadata = {"chunk_id": f"${i}"}
+        # plain text loaders produce documents without heading hierarchy
+        if i % 10:
+            metadata["heading_hierarchy"] = {
+                "previous": f"${i - 1}" if i else "",
+                "next": f"${i + 1}",
+                "child": [],
+                "parent": "",
+            }
+        sections.append(
+            Document(page_content=f"## Heading {i}\n{text}", metadata=metadata)
+        )
+    return sections
+
+
+def benchmark(name, processor_class, section_number):
+    # chunk_generator updates the heading hierarchy of its input, every run
+    # gets fresh sections
+    content = generate_sections(section_number)
+    processor = processor_class(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, batch_size=10
+    )
+    start = time.perf_counter()
+    splits = list(processor.chunk_generator(content))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {elapsed:6.2f}s  {len(splits)} chunks")
+    return [
+        (
+            s.page_content,
+            s.metadata["chunk_id"],
+            s.metadata.get("heading_hierarchy"),
+        )
+        for s in splits
+    ]
+
+
+if __name__ == "__main__":
+    section_number = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    expected = benchmark(
+        "two-pass", LegacyBatchChunkDocumentProcessor, section_number
+    )
+    actual = benchmark("single-pass", BatchChunkDocumentProcessor, section_number)
+    assert expected == actual
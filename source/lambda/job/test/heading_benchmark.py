@@ -0,0 +1,104 @@
+"""
+Micro-benchmark of extract_headings: the former hierarchy builder, which
+looks up parent/previous/next/child by scanning all headings, against the
+single-pass stack-based builder, over generated markdown with nested
+headings. Both must produce the same hierarchy.
+
+Usage: python heading_benchmark.py [heading_number]
+"""
+import os
+import random
+import re
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../dep"))
+
+from llm_bot_dep.splitter_utils import (
+    extract_headings,
+    find_child,
+    find_next_with_same_level,
+    find_parent,
+    find_previous_with_same_level,
+)
+
+
+def legacy_extract_headings(md_content: str):
+    header_index = 0
+    headers = {}
+    id_index_dict = {}
+    for line in md_content.split("\n"):
+        match = re.match(r"\s*(#+)(.*)", line)
+        if match:
+            header_index += 1
+            level = len(match.group(1))
+            title = match.group(2).strip()
+            _id = f"${header_index}-{str(uuid.uuid4())[:8]}"
+            headers[_id] = {
+                "title": title,
+                "level": level,
+                "parent": find_parent(headers, level),
+                "previous": find_previous_with_same_level(headers, level),
+            }
+            id_index_dict.setdefault(title, []).append(_id)
+    for header_obj in headers:
+        headers[header_obj]["child"] = find_child(headers, header_obj)
+        headers[header_obj]["next"] = find_next_with_same_level(
+            headers, header_obj
+        )
+    return headers, id_index_dict
+
+
+def generate_markdown(heading_number: int):
+    random.seed(0)
+    lines = []
+    level = 1
+    for i in range(heading_number):
+        # walk up and down the hierarchy, sometimes skipping a level
+        level = max(1, min(6, level + random.choice([-2, -1, 0, 0, 1, 1, 2])))
+        lines.append(f"{'#' * level} Heading {i % 500}")
+        lines.append("Some paragraph text under the heading.")
+    return "\n".join(lines)
+
+
+def normalize(result):
+    # ids end with a random uuid prefix, compare them by heading index
+    def key(_id):
+        return _id.split("-")[0] if _id else _id
+
+    headers, id_index_dict = result
+    return (
+        {
+            key(_id): {
+                **header,
+                "parent": key(header["parent"]),
+                "previous": key(header["previous"]),
+                "next": key(header["next"]),
+                "child": [key(c) for c in header["child"]],
+            }
+            for _id, header in headers.items()
+        },
+        {title: [key(i) for i in ids] for title, ids in id_index_dict.items()},
+    )
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    heading_number = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    md_content = generate_markdown(heading_number)
+
+    new_time, new_result = timed(extract_headings, md_content)
+    legacy_time, legacy_result = timed(legacy_extract_headings, md_content)
+    assert normalize(new_result) == normalize(legacy_result)
+    print(f"{heading_number} headings")
+    print(f"scanning builder: {legacy_time * 1000:10.1f} ms")
+    print(
+        f"stack builder:    {new_time * 1000:10.1f} ms "
+        f"({legacy_time / new_time:.0f}x)"
+    )
@@ -0,0 +1,89 @@
+"""
+Throughput benchmark of the staged ingestion pipeline against the
+sequential per-file loop, using in-process stand-ins for the ETL model,
+the embedding endpoint and OpenSearch bulk indexing.
+
+Usage: python pipeline_benchmark.py [file_number]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../dep"))
+from llm_bot_dep.pipeline_utils import StagedIngestionPipeline
+
+BATCHES_PER_FILE = 8
+EXTRACT_LATENCY = 0.2
+EMBED_LATENCY = 0.05
+BULK_LATENCY = 0.03
+
+
+class LocalOpenSearch:
+    """Keeps the bulk indexed documents in memory"""
+
+    def __init__(self):
+        self.documents = {}
+
+    def bulk(self, batch):
+        time.sleep(BULK_LATENCY)
+        for doc_id, vector in batch:
+            self.documents[doc_id] = vector
+
+
+def extract(file_id):
+    time.sleep(EXTRACT_LATENCY)
+    return [
+        [f"{file_id}-{batch_id}-{i}" for i in range(10)]
+        for batch_id in range(BATCHES_PER_FILE)
+    ]
+
+
+def embed(batch):
+    time.sleep(EMBED_LATENCY)
+    return [(doc_id, [0.0] * 8) for doc_id in batch]
+
+
+def run_sequential(file_number):
+    opensearch = LocalOpenSearch()
+    for file_id in range(file_number):
+        for batch in extract(file_id):
+            opensearch.bulk(embed(batch))
+    return opensearch
+
+
+def run_pipeline(file_number, **kwargs):
+    opensearch = LocalOpenSearch()
+    statuses = []
+    StagedIngestionPipeline(
+        extract_fn=extract,
+        embed_fn=embed,
+        index_fn=opensearch.bulk,
+        on_status=lambda item, status, detail: statuses.append(status),
+        **kwargs,
+    ).run(range(file_number))
+    assert statuses.count("COMPLETED") == file_number, statuses
+    return opensearch
+
+
+def benchmark(name, fn, file_number, **kwargs):
+    start = time.perf_counter()
+    opensearch = fn(file_number, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<40} {elapsed:6.2f}s  {file_number / elapsed:6.2f} files/s  "
+        f"{len(opensearch.documents)} docs"
+    )
+
+
+if __name__ == "__main__":
+    file_number = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    benchmark("sequential", run_sequential, file_number)
+    for workers in [(2, 4, 2), (4, 8, 4)]:
+        benchmark(
+            f"pipeline extract/embed/index={workers}",
+            run_pipeline,
+            file_number,
+            extraction_workers=workers[0],
+            embedding_workers=workers[1],
+            indexing_workers=workers[2],
+        )
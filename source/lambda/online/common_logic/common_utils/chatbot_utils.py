@@ -35,6 +35,24 @@ class ChatbotManager:
         return model_content
 
 
+    def get_chatbot_version(self, group_name: str, chatbot_id: str):
+        """Get the updateTime of a chatbot, None if the chatbot does not exist
+
+        Args:
+            group_name (str): group name
+            chatbot_id (str): chatbot id
+
+        Returns:
+            str: update time written by chatbot management
+        """
+        chatbot_content = self.chatbot_table.get_item(
+            Key={"groupName": group_name, "chatbotId": chatbot_id},
+            ProjectionExpression="updateTime",
+        ).get("Item")
+        if not chatbot_content:
+            return None
+        return chatbot_content.get("updateTime", "")
+
     def get_chatbot(self, group_name: str, chatbot_id: str):
         """Get chatbot from chatbot id and add index, model, etc. data
 
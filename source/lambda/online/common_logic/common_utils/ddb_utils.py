@@ -32,6 +32,8 @@ class DynamoDBChatMessageHistory(BaseChatMessageHistory):
         self.group_name = group_name
         self.chatbot_id = chatbot_id
         self.MESSAGE_BY_SESSION_ID_INDEX_NAME = "bySessionId"
+        # sorted by createTimestamp, used to read the newest messages first
+        self.MESSAGE_BY_SESSION_ID_TIMESTAMP_INDEX_NAME = "bySessionIdTimestamp"
 
     @property
     def session(self):
@@ -41,65 +43,121 @@ class DynamoDBChatMessageHistory(BaseChatMessageHistory):
         item = response.get("Item")
         return item
 
-    @property
-    def messages(self):
-        """Retrieve the messages from DynamoDB"""
-        response = {}
+    def query_messages(self, limit: int = None) -> List[dict]:
+        """Retrieve the newest messages of the session from DynamoDB
+
+        Args:
+            limit (int, optional): number of messages to read, None reads
+                the whole session
+
+        Returns:
+            List[dict]: message items in chronological order
+        """
         try:
-            response = self.messages_table.query(
-                KeyConditionExpression="sessionId = :session_id",
-                ExpressionAttributeValues={":session_id": self.session_id},
-                IndexName=self.MESSAGE_BY_SESSION_ID_INDEX_NAME,
-            )
+            items = self._query_newest_messages(limit)
         except ClientError as error:
-            if error.response["Error"]["Code"] == "ResourceNotFoundException":
-                print("No record found for session id: %s", self.session_id)
-            else:
+            if error.response["Error"]["Code"] not in (
+                "ValidationException",
+                "ResourceNotFoundException",
+            ):
                 print(error)
+                return []
+            # the timestamp index is not available yet (e.g. still being
+            # backfilled), read the whole session through bySessionId
+            items = self._query_all_messages()
+            items = sorted(items, key=lambda x: x["createTimestamp"])
+            if limit is not None:
+                items = items[-limit:] if limit > 0 else []
+        return items
 
-        items = response.get("Items", [])
-        items = sorted(items, key=lambda x: x["createTimestamp"])
-
+    def _query_newest_messages(self, limit: int = None) -> List[dict]:
+        if limit is not None and limit <= 0:
+            return []
+        query_kwargs = {
+            "KeyConditionExpression": "sessionId = :session_id",
+            "ExpressionAttributeValues": {":session_id": self.session_id},
+            "IndexName": self.MESSAGE_BY_SESSION_ID_TIMESTAMP_INDEX_NAME,
+            "ScanIndexForward": False,
+        }
+        items = []
+        while True:
+            if limit is not None:
+                query_kwargs["Limit"] = limit - len(items)
+            response = self.messages_table.query(**query_kwargs)
+            items.extend(response.get("Items", []))
+            last_evaluated_key = response.get("LastEvaluatedKey")
+            if not last_evaluated_key or (
+                limit is not None and len(items) >= limit
+            ):
+                break
+            query_kwargs["ExclusiveStartKey"] = last_evaluated_key
+        items.reverse()
         return items
 
-    @property
-    def messages_as_langchain(self):
-        response = {}
+    def _query_all_messages(self) -> List[dict]:
+        query_kwargs = {
+            "KeyConditionExpression": "sessionId = :session_id",
+            "ExpressionAttributeValues": {":session_id": self.session_id},
+            "IndexName": self.MESSAGE_BY_SESSION_ID_INDEX_NAME,
+        }
+        items = []
         try:
-            response = self.messages_table.query(
-                KeyConditionExpression="sessionId = :session_id",
-                ExpressionAttributeValues={":session_id": self.session_id},
-                IndexName=self.MESSAGE_BY_SESSION_ID_INDEX_NAME,
-            )
+            while True:
+                response = self.messages_table.query(**query_kwargs)
+                items.extend(response.get("Items", []))
+                last_evaluated_key = response.get("LastEvaluatedKey")
+                if not last_evaluated_key:
+                    break
+                query_kwargs["ExclusiveStartKey"] = last_evaluated_key
         except ClientError as error:
             if error.response["Error"]["Code"] == "ResourceNotFoundException":
                 print("No record found for session id: %s", self.session_id)
             else:
                 print(error)
-        items = response.get("Items", [])
-        items = sorted(items, key=lambda x: x["createTimestamp"])
-        ret = []
-
-        for item in items:
-            assert item["role"] in [
-                MessageType.AI_MESSAGE_TYPE,
-                MessageType.HUMAN_MESSAGE_TYPE,
-            ]
-            role = item["role"]
-            additional_kwargs = json.loads(item["additional_kwargs"])
-            langchain_message_template = {
-                "role": role,
-                "content": item["content"],
-                "additional_kwargs": {
-                    "message_id": item["messageId"],
-                    "create_time": item["createTimestamp"],
-                    "entry_type": item["entryType"],
-                    "custom_message_id": item["customMessageId"],
-                    **additional_kwargs,
-                },
-            }
-            ret.append(langchain_message_template)
-        return ret
+        return items
+
+    @property
+    def messages(self):
+        """Retrieve the messages from DynamoDB"""
+        return self.query_messages()
+
+    @staticmethod
+    def to_langchain_message(item: dict) -> dict:
+        assert item["role"] in [
+            MessageType.AI_MESSAGE_TYPE,
+            MessageType.HUMAN_MESSAGE_TYPE,
+        ]
+        role = item["role"]
+        additional_kwargs = json.loads(item["additional_kwargs"])
+        return {
+            "role": role,
+            "content": item["content"],
+            "additional_kwargs": {
+                "message_id": item["messageId"],
+                "create_time": item["createTimestamp"],
+                "entry_type": item["entryType"],
+                "custom_message_id": item["customMessageId"],
+                **additional_kwargs,
+            },
+        }
+
+    def get_messages_as_langchain(self, limit: int = None) -> List[dict]:
+        """Retrieve the newest messages in the langchain message format
+
+        Only the returned messages are decoded.
+
+        Args:
+            limit (int, optional): number of messages to read, None reads
+                the whole session
+        """
+        return [
+            self.to_langchain_message(item)
+            for item in self.query_messages(limit)
+        ]
+
+    @property
+    def messages_as_langchain(self):
+        return self.get_messages_as_langchain()
 
     def update_session(self, latest_question=""):
         """Add the session to the record in DynamoDB"""
@@ -6,7 +6,8 @@ from common_logic.common_utils.ddb_utils import DynamoDBChatMessageHistory
 from shared.constant import StreamMessageType
 from shared.utils.logger_utils import get_logger
 from shared.utils.websocket_utils import (
-    check_stop_signal,
+    StopSignalPoller,
+    StreamChunkSender,
     clear_stop_signal,
     send_to_ws_client,
 )
@@ -83,6 +84,8 @@ def stream_response(event_body: dict, response: dict):
 
     ddb_history_obj = event_body["ddb_history_obj"]
     answer_str = ""
+    stop_signal_poller = StopSignalPoller(ws_connection_id)
+    chunk_sender = None
 
     try:
         send_to_ws_client(
@@ -94,12 +97,30 @@ def stream_response(event_body: dict, response: dict):
             ws_connection_id=ws_connection_id,
         )
 
+        def send_chunk(content: str, chunk_id: int):
+            send_to_ws_client(
+                message={
+                    "message_type": StreamMessageType.CHUNK,
+                    "message_id": f"ai_{message_id}",
+                    "custom_message_id": custom_message_id,
+                    "message": {
+                        "role": "assistant",
+                        "content": content,
+                    },
+                    "chunk_id": chunk_id,
+                },
+                ws_connection_id=ws_connection_id,
+            )
+
+        chunk_sender = StreamChunkSender(send_chunk).start()
+        stop_signal_poller.start()
         for i, chunk in enumerate(answer):
-            # Check for stop signal before sending each chunk
-            if check_stop_signal(ws_connection_id):
+            # Check for stop signal set by the background poller
+            if stop_signal_poller.is_stopped():
                 logger.info(
                     f"Stop signal detected for connection {ws_connection_id}"
                 )
+                chunk_sender.flush()
                 # Send END message to notify frontend and stop the session
                 send_to_ws_client(
                     {
@@ -118,20 +139,9 @@ def stream_response(event_body: dict, response: dict):
                     f"{custom_message_id} running time of first token whole {entry_type} entry: {first_token_time-request_timestamp}s"
                 )
 
-            send_to_ws_client(
-                message={
-                    "message_type": StreamMessageType.CHUNK,
-                    "message_id": f"ai_{message_id}",
-                    "custom_message_id": custom_message_id,
-                    "message": {
-                        "role": "assistant",
-                        "content": chunk,
-                    },
-                    "chunk_id": i,
-                },
-                ws_connection_id=ws_connection_id,
-            )
+            chunk_sender.add(chunk)
             answer_str += chunk
+        chunk_sender.flush()
 
         # if isinstance(answer, ReasonModelStreamResult):
         #     for i, chunk in enumerate(answer.think_stream):
@@ -350,6 +360,10 @@ def stream_response(event_body: dict, response: dict):
             ws_connection_id=ws_connection_id,
         )
         clear_stop_signal(ws_connection_id)
+    finally:
+        stop_signal_poller.close()
+        if chunk_sender is not None:
+            chunk_sender.close()
     return answer_str
 
 
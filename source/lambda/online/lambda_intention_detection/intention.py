@@ -1,9 +1,9 @@
 import json
 import pathlib
 import os
-import asyncio
 from typing import List
 from langchain_core.documents import Document
+from shared.utils.asyncio_utils import run_coroutine_sync
 from shared.utils.logger_utils import get_logger
 from shared.utils.lambda_invoke_utils import chatbot_lambda_call_wrapper
 from shared.langchain_integration.retrievers import OpensearchHybridQueryQuestionRetriever
@@ -15,7 +15,7 @@ intelli_agent_kb_enabled = kb_type.get(
     "intelliAgentKb", {}).get("enabled", False)
 
 
-def get_intention_results(query: str, intention_config: dict, intent_threshold: float):
+async def aget_intention_results(query: str, intention_config: dict, intent_threshold: float):
     """get intention few shots results according embedding similarity
 
     Args:
@@ -45,7 +45,7 @@ def get_intention_results(query: str, intention_config: dict, intent_threshold:
         **retriver_config
     ) for retriver_config in intention_config['retrievers']
     ])
-    intention_retrievered:List[Document] = asyncio.run(intention_retriever.ainvoke(event_body['query']))
+    intention_retrievered:List[Document] = await intention_retriever.ainvoke(event_body['query'])
     # res = retrieve_fn(event_body)
 
     if not intention_retrievered:
@@ -88,6 +88,13 @@ def get_intention_results(query: str, intention_config: dict, intent_threshold:
     return intent_fewshot_examples, True
 
 
+def get_intention_results(query: str, intention_config: dict, intent_threshold: float):
+    """sync version of aget_intention_results"""
+    return run_coroutine_sync(
+        aget_intention_results(query, intention_config, intent_threshold)
+    )
+
+
 @chatbot_lambda_call_wrapper
 def lambda_handler(state: dict, context=None):
     intention_config = state["chatbot_config"].get("intention_config", {})
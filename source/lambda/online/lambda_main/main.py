@@ -37,6 +37,8 @@ chatbot_table = dynamodb.Table(os.environ.get("CHATBOT_TABLE_NAME"))
 model_table = dynamodb.Table(os.environ.get("MODEL_TABLE_NAME"))
 embedding_endpoint = os.environ.get("EMBEDDING_ENDPOINT")
 create_time = str(datetime.now(timezone.utc))
+# upper bound of history messages loaded when the request sets no round limit
+chat_history_max_messages = int(os.environ.get("CHAT_HISTORY_MAX_MESSAGES", 100))
 connect_client = boto3.client("connectcases")
 connect_domain_id = os.environ.get("CONNECT_DOMAIN_ID", "")
 connect_user_arn = os.environ.get("CONNECT_USER_ARN", "")
@@ -68,6 +70,30 @@ def create_ddb_history_obj(session_id: str, user_id: str, client_type: str, grou
     )
 
 
+def get_chat_history_limit(chatbot_config: dict) -> int:
+    """Number of newest history messages the entry needs
+
+    common_entry keeps the last 2 * max_rounds_in_memory messages, so there
+    is no point in reading more than that from DynamoDB.
+
+    Args:
+        chatbot_config (dict): The chatbot config of the request
+
+    Returns:
+        int: The number of messages to load
+    """
+    use_history = str(chatbot_config.get("use_history", "true")).lower() == "true"
+    if not use_history:
+        return 0
+    try:
+        max_rounds_in_memory = int(chatbot_config.get("max_rounds_in_memory"))
+    except (TypeError, ValueError):
+        max_rounds_in_memory = 0
+    if max_rounds_in_memory > 0:
+        return 2 * max_rounds_in_memory
+    return chat_history_max_messages
+
+
 def compose_connect_body(event_body: dict, context: dict):
     """
     Compose the body for the Amazon Connect API request based on the event and context.
@@ -122,7 +148,9 @@ def compose_connect_body(event_body: dict, context: dict):
         group_name=group_name,
         chatbot_id=chatbot_id
     )
-    chat_history = ddb_history_obj.messages_as_langchain
+    chat_history = ddb_history_obj.get_messages_as_langchain(
+        limit=chat_history_max_messages
+    )
 
     agent_flow_body = {}
     agent_flow_body["query"] = query
@@ -254,7 +282,9 @@ def restapi_event_handler(event_body: dict, context: dict, entry_executor):
 
     ddb_history_obj = create_ddb_history_obj(
         assembled_body["session_id"], assembled_body["user_id"], assembled_body["client_type"], assembled_body["group_name"], assembled_body["chatbot_id"])
-    chat_history = ddb_history_obj.messages_as_langchain
+    chat_history = ddb_history_obj.get_messages_as_langchain(
+        limit=get_chat_history_limit(event_body.get("chatbot_config", {}))
+    )
 
     standard_event_body = {
         "query": event_body["query"],
@@ -308,7 +338,9 @@ def default_event_handler(event_body: dict, context: dict, entry_executor):
 
     ddb_history_obj = create_ddb_history_obj(
         assembled_body["session_id"], assembled_body["user_id"], assembled_body["client_type"], assembled_body["group_name"], assembled_body["chatbot_id"])
-    chat_history = ddb_history_obj.messages_as_langchain
+    chat_history = ddb_history_obj.get_messages_as_langchain(
+        limit=get_chat_history_limit(event_body.get("chatbot_config", {}))
+    )
 
     event_body["stream"] = context["stream"]
     event_body["chat_history"] = chat_history
@@ -1,6 +1,7 @@
 import asyncio
 import json
 import re
+import time
 import traceback
 import uuid
 from typing import Annotated, Any, List, TypedDict, Union
@@ -12,7 +13,7 @@ from common_logic.common_utils.response_utils import (
     process_response,
 )
 from common_logic.common_utils.serialization_utils import JSONEncoder
-from lambda_intention_detection.intention import get_intention_results
+from lambda_intention_detection.intention import aget_intention_results
 from lambda_main.main_utils.parse_config import CommonConfigParser
 from lambda_query_preprocess.query_preprocess import conversation_query_rewrite
 from langchain.retrievers.merger_retriever import MergerRetriever
@@ -28,11 +29,18 @@ from shared.constant import (
     SceneType,
 )
 from shared.langchain_integration.chains import LLMChain
+from shared.langchain_integration.models.embedding_models.embedding_cache import (
+    query_embedding_cache,
+)
 from shared.langchain_integration.retrievers import (
     OpensearchHybridQueryDocumentRetriever,
     OpensearchHybridQueryQuestionRetriever,
 )
+from shared.langchain_integration.retrievers.retriever_registry import (
+    retriever_registry,
+)
 from shared.langchain_integration.tools import ToolManager
+from shared.utils.asyncio_utils import run_coroutine_sync
 from shared.utils.lambda_invoke_utils import (
     is_running_local,
     node_monitor_wrapper,
@@ -161,53 +169,144 @@ def query_preprocess(state: ChatbotState):
     return {"query_rewrite": output}
 
 
+async def _atimed(coro, stage: str, stage_timings: dict):
+    start_time = time.time()
+    try:
+        return await coro
+    finally:
+        stage_timings[stage] = round(time.time() - start_time, 3)
+
+
+async def aretrieve_for_intention_detection(
+    query: str,
+    qq_retriever: MergerRetriever,
+    qq_match_threshold: float,
+    intention_query: Union[str, None] = None,
+    intention_config: Union[dict, None] = None,
+    qd_retriever: Union[MergerRetriever, None] = None,
+):
+    """Run qq match, intention retrieval and knowledge retrieval in one loop.
+
+    The intention and knowledge stages are launched speculatively together
+    with qq match. They are cancelled as soon as a qq hit exceeds
+    qq_match_threshold, and knowledge retrieval is cancelled once intention
+    fewshot examples are found.
+
+    Returns:
+        dict: qq_retrievered, intent_fewshot_examples, qd_retrievered,
+            stage_timings and cancelled_stages
+    """
+    stage_timings = {}
+    tasks = {
+        "qq_match": asyncio.create_task(
+            _atimed(qq_retriever.ainvoke(query), "qq_match", stage_timings)
+        )
+    }
+    if intention_config is not None:
+        tasks["intention"] = asyncio.create_task(
+            _atimed(
+                aget_intention_results(
+                    intention_query,
+                    {**intention_config},
+                    intent_threshold=intention_config["intent_threshold"],
+                ),
+                "intention",
+                stage_timings,
+            )
+        )
+    if qd_retriever is not None:
+        tasks["knowledge"] = asyncio.create_task(
+            _atimed(qd_retriever.ainvoke(query), "knowledge", stage_timings)
+        )
+
+    ret = {
+        "qq_retrievered": [],
+        "intent_fewshot_examples": [],
+        "qd_retrievered": [],
+        "stage_timings": stage_timings,
+        "cancelled_stages": [],
+    }
+    try:
+        ret["qq_retrievered"] = await tasks["qq_match"]
+        if any(
+            doc.metadata["retrieval_score"] > qq_match_threshold
+            for doc in ret["qq_retrievered"]
+        ):
+            return ret
+        if "intention" in tasks:
+            ret["intent_fewshot_examples"], _ = await tasks["intention"]
+        if "knowledge" in tasks and not ret["intent_fewshot_examples"]:
+            ret["qd_retrievered"] = await tasks["knowledge"]
+        return ret
+    finally:
+        for stage, task in tasks.items():
+            if not task.done():
+                task.cancel()
+                ret["cancelled_stages"].append(stage)
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+
 @node_monitor_wrapper
 def intention_detection(state: ChatbotState):
     qq_match_config = state["chatbot_config"]["qq_match_config"]
-    # retriever_params["query"] = state[
-    #     retriever_params.get("retriever_config", {}).get("query_key", "query")
-    # ]
+    only_use_rag_tool = state["chatbot_config"]["agent_config"][
+        "only_use_rag_tool"
+    ]
 
     qq_retrievers = [
         OpensearchHybridQueryQuestionRetriever.from_config(**retriver_config)
         for retriver_config in qq_match_config["retrievers"]
     ]
-
     qq_retriever = MergerRetriever(retrievers=qq_retrievers)
-    # qq_retriever = OpensearchHybridQueryQuestionRetriever.from_config(
-    #     **retriever_params
-    # )
-    qq_retrievered: List[Document] = asyncio.run(
-        qq_retriever.ainvoke(state["query"])
-    )
 
-    # output = retrieve_fn(retriever_params)
-    # context_list = []
     qq_match_results = []  # used in rag tool
     qq_match_threshold = qq_match_config["qq_match_threshold"]
     qq_in_rag_context_threshold = qq_match_config["qq_in_rag_context_threshold"]
 
-    # for doc in output["result"]["docs"]:
-    #     if doc["retrieval_score"] > qq_match_threshold:
-    #         doc_md = format_qq_data(doc)
-    #         send_trace(
-    #             f"\n\n**similar query found**\n\n{doc_md}",
-    #             state["stream"],
-    #             state["ws_connection_id"],
-    #             state["enable_trace"],
-    #         )
-    #         query_content = doc["answer"]
-    #         # query_content = doc['answer']['jsonlAnswer']
-    #         return {
-    #             "answer": query_content,
-    #             "intent_type": "similar query found",
-    #         }
-
-    #     if doc["retrieval_score"] > qq_in_rag_context_threshold:
-    #         question = doc["question"]
-    #         answer = doc["answer"]
-    #         context_list.append(f"问题: {question}, \n答案：{answer}")
-    #         qq_match_contexts.append(doc)
+    # intention and knowledge retrieval are not needed when only the rag
+    # tool is used, otherwise they are started together with qq match
+    intention_config = None
+    intention_query = None
+    qd_retriever = None
+    if not only_use_rag_tool:
+        intention_config = state["chatbot_config"].get("intention_config", {})
+        query_key = intention_config.get("retriever_config", {}).get(
+            "query_key", "query"
+        )
+        intention_query = state[query_key]
+        private_knowledge_config = state["chatbot_config"][
+            "private_knowledge_config"
+        ]
+        qd_retrievers = [
+            OpensearchHybridQueryDocumentRetriever.from_config(
+                **retriver_config
+            )
+            for retriver_config in private_knowledge_config["retrievers"]
+        ]
+        qd_retriever = MergerRetriever(retrievers=qd_retrievers)
+
+    retrieval_ret = run_coroutine_sync(
+        aretrieve_for_intention_detection(
+            query=state["query"],
+            qq_retriever=qq_retriever,
+            qq_match_threshold=qq_match_threshold,
+            intention_query=intention_query,
+            intention_config=intention_config,
+            qd_retriever=qd_retriever,
+        )
+    )
+    stage_timings_md = ", ".join(
+        f"{stage}: {elapsed}s"
+        + (" (cancelled)" if stage in retrieval_ret["cancelled_stages"] else "")
+        for stage, elapsed in retrieval_ret["stage_timings"].items()
+    )
+    send_trace(
+        f"\n\n**retrieval stage timings**: {stage_timings_md}\n\n",
+        state["stream"],
+        state["ws_connection_id"],
+        state["enable_trace"],
+    )
+    qq_retrievered: List[Document] = retrieval_ret["qq_retrievered"]
 
     # TODO modify intention and qq match score
 
@@ -239,31 +338,17 @@ def intention_detection(state: ChatbotState):
                     metadata={**doc.metadata},
                 )
             )
-            # qq_match_contexts.append(Document(
-            # ))
-    if state["chatbot_config"]["agent_config"]["only_use_rag_tool"]:
+    if only_use_rag_tool:
         return {
             "qq_match_results": qq_match_results,
             "intent_type": "intention detected",
         }
 
     # get intention results from aos
-    intention_config = state["chatbot_config"].get("intention_config", {})
-    query_key = intention_config.get("retriever_config", {}).get(
-        "query_key", "query"
-    )
-    query = state[query_key]
-    intent_threshold = intention_config["intent_threshold"]
     all_knowledge_in_agent_threshold = intention_config[
         "all_knowledge_in_agent_threshold"
     ]
-    intent_fewshot_examples, intention_ready = get_intention_results(
-        query,
-        {
-            **intention_config,
-        },
-        intent_threshold=intent_threshold,
-    )
+    intent_fewshot_examples = retrieval_ret["intent_fewshot_examples"]
 
     intent_fewshot_tools: list[str] = list(
         set([e["intent"] for e in intent_fewshot_examples])
@@ -271,49 +356,15 @@ def intention_detection(state: ChatbotState):
     all_knowledge_retrieved_list = []
     markdown_table = format_intention_output(intent_fewshot_examples)
 
-    # group_name = state["chatbot_config"]["group_name"]
-    # chatbot_id = state["chatbot_config"]["chatbot_id"]
-    # custom_qd_index = custom_index_desc(group_name, chatbot_id)
-
     # TODO need to modify with new intent logic
     # 1. no intention configuration
     # 2. has configured intention, and intention not valid
     if not intent_fewshot_examples:
-        # if not intention_ready:
         # retrieve all knowledge
-        # retriever_params = state["chatbot_config"]["private_knowledge_config"]
-        # retriever_params["query"] = state[
-        #     retriever_params.get("retriever_config", {}).get(
-        #         "query_key", "query")
-        # ]
-
-        private_knowledge_config = state["chatbot_config"][
-            "private_knowledge_config"
-        ]
-
-        qd_retrievers = [
-            OpensearchHybridQueryDocumentRetriever.from_config(
-                **retriver_config
-            )
-            for retriver_config in private_knowledge_config["retrievers"]
-        ]
-
-        qd_retriever = MergerRetriever(retrievers=qd_retrievers)
-        # qd_retriever = OpensearchHybridQueryDocumentRetriever.from_config(
-        #     **retriever_params
-        # )
-        qd_retrievered: List[Document] = asyncio.run(
-            qd_retriever.ainvoke(state["query"])
-        )
-        # output = retrieve_fn(retriever_params)
+        qd_retrievered: List[Document] = retrieval_ret["qd_retrievered"]
 
         info_to_log = []
         all_knowledge_retrieved_list = []
-        # for doc in output["result"]["docs"]:
-        #     if doc['score'] >= all_knowledge_in_agent_threshold:
-        #         all_knowledge_retrieved_list.append(doc["page_content"])
-        #     info_to_log.append(
-        #         f"score: {doc['score']}, page_content: {doc['page_content'][:200]}")
         for doc in qd_retrievered:
             if doc.metadata["retrieval_score"] >= all_knowledge_in_agent_threshold:
                 all_knowledge_retrieved_list.append(
@@ -766,6 +817,9 @@ def common_entry(event_body):
     if app is None:
         app = build_graph(ChatbotState)
 
+    # query embeddings are shared by all retrievers within one turn
+    query_embedding_cache.reset_request()
+
     # debuging
     if is_running_local():
         with open("common_entry_workflow.png", "wb") as f:
@@ -844,6 +898,8 @@ def common_entry(event_body):
         config={"recursion_limit": 20},
     )
     clear_stop_signal(ws_connection_id)
+    logger.info(f"query embedding cache stats: {query_embedding_cache.stats()}")
+    logger.info(f"retriever registry stats: {retriever_registry.stats()}")
     return response["app_response"]
 
 
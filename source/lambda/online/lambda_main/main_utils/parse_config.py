@@ -1,8 +1,13 @@
 import copy
+import hashlib
+import json
 import os
+import time
 
 from shared.constant import IndexType
+from shared.utils.cache_utils import LRUCache
 from shared.utils.logger_utils import get_logger
+from common_logic.common_utils.chatbot_utils import ChatbotManager
 from common_logic.common_utils.pydantic_models import (
     ChatbotConfig,
     LLMConfig,
@@ -13,6 +18,96 @@ from shared.utils.python_utils import update_nest_dict
 
 logger = get_logger("parse_config")
 
+CHATBOT_CONFIG_CACHE_SIZE = int(os.environ.get("CHATBOT_CONFIG_CACHE_SIZE", 256))
+# seconds between two checks of the chatbot updateTime
+CHATBOT_CONFIG_CHECK_INTERVAL = float(
+    os.environ.get("CHATBOT_CONFIG_CHECK_INTERVAL", 60)
+)
+# resolved configs are rebuilt after this many seconds even if the chatbot
+# is unchanged, model and index items carry no version of their own
+CHATBOT_CONFIG_MAX_AGE = float(os.environ.get("CHATBOT_CONFIG_MAX_AGE", 900))
+
+
+class ResolvedChatbotConfigCache:
+    """Cache of resolved chatbot configs across warm invocations.
+
+    Entries are keyed by group name, chatbot id and a hash of the chatbot
+    config sent with the request. An entry is served without any DynamoDB
+    read for ``check_interval`` seconds, then the updateTime of the chatbot,
+    written by chatbot management on every change, is read again and the
+    entry is resolved again if it differs. ``max_age`` bounds the lifetime of
+    an entry whatever its version.
+    """
+
+    def __init__(
+        self,
+        max_size: int = CHATBOT_CONFIG_CACHE_SIZE,
+        check_interval: float = CHATBOT_CONFIG_CHECK_INTERVAL,
+        max_age: float = CHATBOT_CONFIG_MAX_AGE,
+    ):
+        self.lru = LRUCache(max_size=max_size)
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._chatbot_manager = None
+
+    @property
+    def chatbot_manager(self) -> ChatbotManager:
+        if self._chatbot_manager is None:
+            self._chatbot_manager = ChatbotManager.from_environ()
+        return self._chatbot_manager
+
+    @staticmethod
+    def get_cache_key(chatbot_config: dict) -> tuple:
+        overrides = json.dumps(chatbot_config, sort_keys=True, default=str)
+        return (
+            chatbot_config["group_name"],
+            chatbot_config["chatbot_id"],
+            hashlib.sha256(overrides.encode("utf-8")).hexdigest(),
+        )
+
+    def get_version(self, group_name: str, chatbot_id: str):
+        return self.chatbot_manager.get_chatbot_version(group_name, chatbot_id)
+
+    def get_or_resolve(self, chatbot_config: dict, resolve_fn) -> dict:
+        """Return a copy of the resolved config, resolving it on a miss."""
+        if self.lru.max_size <= 0:
+            return resolve_fn(chatbot_config)
+
+        key = self.get_cache_key(chatbot_config)
+        group_name, chatbot_id, _ = key
+        now = time.time()
+        entry = self.lru.get(key)
+        if entry is not None:
+            if now - entry["resolved_at"] > self.max_age:
+                entry = None
+            elif now - entry["checked_at"] > self.check_interval:
+                if self.get_version(group_name, chatbot_id) == entry["version"]:
+                    entry["checked_at"] = now
+                else:
+                    logger.info(
+                        f"chatbot {group_name}/{chatbot_id} changed, resolving its config again"
+                    )
+                    entry = None
+
+        if entry is None:
+            # read the version first, a change made while resolving is then
+            # caught by the next check
+            version = self.get_version(group_name, chatbot_id)
+            entry = {
+                "value": resolve_fn(chatbot_config),
+                "version": version,
+                "resolved_at": now,
+                "checked_at": now,
+            }
+            self.lru.put(key, entry)
+        return copy.deepcopy(entry["value"])
+
+    def clear(self):
+        self.lru.clear()
+
+
+resolved_chatbot_config_cache = ResolvedChatbotConfigCache()
+
 
 class ConfigParserBase:
     default_llm_config_str = "{'model_id': 'anthropic.claude-3-sonnet-20240229-v1:0', 'model_kwargs': {'temperature': 0.01, 'max_tokens': 4096}}"
@@ -58,6 +153,12 @@ class ConfigParserBase:
 
     @classmethod
     def from_chatbot_config(cls, chatbot_config: dict):
+        return resolved_chatbot_config_cache.get_or_resolve(
+            chatbot_config, cls.resolve_chatbot_config
+        )
+
+    @classmethod
+    def resolve_chatbot_config(cls, chatbot_config: dict):
         chatbot_config = copy.deepcopy(chatbot_config)
         default_llm_config = cls.parse_default_llm_config(chatbot_config)
         default_index_names = cls.parse_default_index_names(chatbot_config)
@@ -0,0 +1,118 @@
+"""Benchmark chat history loading for long sessions.
+
+Compares the former loader (query the whole session, decode every message,
+sort, then keep the last 2 * max_rounds_in_memory messages) with the bounded
+newest-first loader of DynamoDBChatMessageHistory. The messages table is
+emulated in memory with DynamoDB query semantics (1 MB pages, Limit,
+ScanIndexForward), so no AWS resource is needed.
+
+    python chat_history_benchmark.py [session_messages] [max_rounds_in_memory]
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../.."))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from common_logic.common_utils.ddb_utils import DynamoDBChatMessageHistory
+
+PAGE_BYTES = 1024 * 1024
+
+
+class InMemoryMessagesTable:
+    """Just enough of a boto3 Table to serve bySessionId* queries."""
+
+    def __init__(self, items):
+        self.items = items
+        self.read_bytes = 0
+        self.requests = 0
+
+    def query(self, IndexName, ScanIndexForward=True, Limit=None,
+              ExclusiveStartKey=None, **kwargs):
+        self.requests += 1
+        items = self.items
+        if IndexName == "bySessionIdTimestamp":
+            items = sorted(items, key=lambda x: x["createTimestamp"],
+                           reverse=not ScanIndexForward)
+        start = ExclusiveStartKey["position"] if ExclusiveStartKey else 0
+        page, size, position = [], 0, start
+        while position < len(items):
+            item_size = len(json.dumps(items[position]))
+            if size + item_size > PAGE_BYTES or (Limit and len(page) >= Limit):
+                break
+            page.append(items[position])
+            size += item_size
+            position += 1
+        self.read_bytes += size
+        response = {"Items": page}
+        if position < len(items):
+            response["LastEvaluatedKey"] = {"position": position}
+        return response
+
+
+def make_session(message_count: int):
+    start = datetime(2024, 1, 1)
+    items = []
+    for i in range(message_count):
+        items.append({
+            "messageId": f"m{i}",
+            "sessionId": "s",
+            "role": "human" if i % 2 == 0 else "ai",
+            "customMessageId": "",
+            "entryType": "common",
+            "content": "How do I configure the knowledge base? " * 10,
+            "createTimestamp": (start + timedelta(seconds=i)).isoformat() + "Z",
+            "additional_kwargs": json.dumps({"figure": [], "ref_docs": ["doc"] * 5}),
+        })
+    # GSI without a sort key returns items in no particular order
+    items.reverse()
+    return items
+
+
+def legacy_load(history, limit):
+    response = history.messages_table.query(
+        KeyConditionExpression="sessionId = :session_id",
+        ExpressionAttributeValues={":session_id": history.session_id},
+        IndexName=history.MESSAGE_BY_SESSION_ID_INDEX_NAME,
+    )
+    items = sorted(response.get("Items", []), key=lambda x: x["createTimestamp"])
+    messages = [history.to_langchain_message(item) for item in items]
+    return messages[-limit:]
+
+
+def new_history(table):
+    history = DynamoDBChatMessageHistory.__new__(DynamoDBChatMessageHistory)
+    history.messages_table = table
+    history.session_id = "s"
+    history.MESSAGE_BY_SESSION_ID_INDEX_NAME = "bySessionId"
+    history.MESSAGE_BY_SESSION_ID_TIMESTAMP_INDEX_NAME = "bySessionIdTimestamp"
+    return history
+
+
+def run(name, load, items, limit, repeat=20):
+    table = InMemoryMessagesTable(items)
+    history = new_history(table)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        messages = load(history, limit)
+    elapsed = (time.perf_counter() - start) / repeat
+    print(
+        f"{name:<8} {elapsed * 1000:8.2f} ms/turn  "
+        f"{table.read_bytes / repeat / 1024:9.1f} KiB read/turn  "
+        f"{table.requests / repeat:5.1f} requests/turn  "
+        f"last message: {messages[-1]['additional_kwargs']['message_id']}"
+    )
+
+
+if __name__ == "__main__":
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    max_rounds_in_memory = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    limit = 2 * max_rounds_in_memory
+    items = make_session(message_count)
+    print(f"{message_count} messages in session, keeping the last {limit}")
+    run("legacy", legacy_load, items, limit)
+    run("bounded", lambda h, n: h.get_messages_as_langchain(limit=n), items, limit)
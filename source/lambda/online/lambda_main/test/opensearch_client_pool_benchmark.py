@@ -0,0 +1,44 @@
+"""Benchmark the per-turn OpenSearch setup cost with and without the
+process-wide client pool.
+
+Needs a reachable domain, configured through AOS_ENDPOINT, AWS_REGION and
+(optionally) AOS_SECRET_NAME in the .env file used by the other local tests.
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../.."))
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+from shared.langchain_integration.retrievers.databases.opensearch import (
+    OpenSearchHybridSearch,
+    opensearch_client_pool,
+)
+
+INDEX_NAME = os.environ.get("BENCHMARK_INDEX_NAME", "admin-qd-default")
+EMBEDDING_DIMENSION = int(os.environ.get("BENCHMARK_EMBEDDING_DIMENSION", 1024))
+
+
+def run_turns(turns: int, use_pool: bool) -> float:
+    start = time.perf_counter()
+    for _ in range(turns):
+        if not use_pool:
+            opensearch_client_pool.clear()
+        OpenSearchHybridSearch(
+            index_name=INDEX_NAME, embedding_dimension=EMBEDDING_DIMENSION
+        )
+    return (time.perf_counter() - start) / turns
+
+
+if __name__ == "__main__":
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    cold = run_turns(turns, use_pool=False)
+    opensearch_client_pool.clear()
+    run_turns(1, use_pool=True)
+    warm = run_turns(turns, use_pool=True)
+    print(f"cold setup per turn: {cold * 1000:.1f} ms")
+    print(f"warm setup per turn: {warm * 1000:.1f} ms")
+    print(f"saving per turn:     {(cold - warm) * 1000:.1f} ms")
@@ -0,0 +1,118 @@
+"""Benchmark the streaming reference-tag filter of the RAG tool.
+
+A synthetic answer with a <reference>N</reference> tag every few sentences
+is streamed as small token chunks (tags split across chunks) and as one
+string (the non-streaming path). The former character by character filter
+is compared with the chunk-level ReferenceTagFilter.
+
+    python reference_filter_benchmark.py [kilobytes] [max_chunk_size]
+"""
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../.."))
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+from shared.langchain_integration.tools.common_tools.rag import filter_response
+
+
+def legacy_filter_response(res, state):
+    buffer = ""
+    references = []
+    tag_start = "<reference>"
+    tag_end = "</reference>"
+
+    for char in res:
+        char_strip = char.strip()
+        if not buffer and char_strip not in ["<", "<reference"]:
+            yield char
+            continue
+        buffer += char
+        if buffer.strip() == tag_start[: len(buffer.strip())]:
+            continue
+        elif buffer.startswith(tag_start):
+            buffer = buffer.strip()
+            if buffer.endswith(tag_end):
+                ref_content = buffer[len(tag_start) : -len(tag_end)]
+                try:
+                    references.append(int(ref_content))
+                except ValueError:
+                    pass
+                buffer = ""
+            continue
+        else:
+            yield buffer[0]
+            buffer = buffer[1:]
+    if buffer:
+        yield buffer
+    state["extra_response"]["references"] = references
+
+
+def make_answer(kilobytes: float):
+    sentences = []
+    size = 0
+    i = 0
+    while size < kilobytes * 1024:
+        sentence = f"The knowledge base setting number {i} is described here. "
+        if i % 3 == 0:
+            sentence += f"<reference>{i % 5 + 1}</reference>"
+        sentences.append(sentence)
+        size += len(sentence)
+        i += 1
+    return "".join(sentences)
+
+
+def tokenize(text: str, max_chunk_size: int):
+    # the legacy filter only finds tags streamed as "<" + "reference" + ...
+    chunks = []
+    pos = 0
+    while pos < len(text):
+        if text.startswith("<", pos):
+            end = text.index(">", pos) + 1
+            chunks.extend(["<", text[pos + 1 : end]])
+            pos = end
+            continue
+        step = random.randint(1, max_chunk_size)
+        next_tag = text.find("<", pos)
+        end = pos + step if next_tag == -1 else min(pos + step, next_tag)
+        chunks.append(text[pos:end])
+        pos = end
+    return chunks
+
+
+def best_time(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def run(name, filter_fn, res_factory, size_kb):
+    docs = [SimpleNamespace(metadata={}) for _ in range(5)]
+    state = {"extra_response": {"docs": docs}}
+    elapsed, output = best_time(
+        lambda: "".join(filter_fn(res_factory(), state))
+    )
+    print(f"{name:28s} {elapsed * 1000:8.2f} ms {size_kb / 1024 / elapsed:8.1f} MB/s")
+    return output, state["extra_response"].get("references")
+
+
+if __name__ == "__main__":
+    kilobytes = float(sys.argv[1]) if len(sys.argv) > 1 else 256
+    max_chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    random.seed(0)
+    answer = make_answer(kilobytes)
+    chunks = tokenize(answer, max_chunk_size)
+    print(f"{kilobytes} KB answer, {len(chunks)} chunks")
+
+    legacy = run("char filter, stream", legacy_filter_response, lambda: iter(chunks), kilobytes)
+    new = run("chunk filter, stream", filter_response, lambda: iter(chunks), kilobytes)
+    assert legacy == new
+    legacy = run("char filter, whole answer", legacy_filter_response, lambda: answer, kilobytes)
+    new = run("chunk filter, whole answer", filter_response, lambda: answer, kilobytes)
+    assert legacy == new
@@ -0,0 +1,110 @@
+"""Benchmark the SageMaker rerank path against a local stub endpoint.
+
+The stub sagemaker-runtime client sleeps for a fixed per-request latency
+plus a per-pair cost, then returns random scores, so the benchmark needs no
+AWS resource. It compares the former sequential batch loop (one blocking
+invoke_endpoint per batch, deepcopy of every document's metadata) with the
+concurrent BatchRerankBase flow, and a repeated query answered from the
+rerank score cache.
+
+    python rerank_benchmark.py [documents] [batch_size] [max_concurrency]
+"""
+import io
+import json
+import os
+import random
+import sys
+import time
+from copy import deepcopy
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../.."))
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+from langchain_core.documents import Document
+from shared.langchain_integration.models.rerank_models.batch_rerank import (
+    rerank_score_cache,
+)
+from shared.langchain_integration.models.rerank_models.sagemaker_rerank import (
+    RerankContentHandler,
+    SagemakerEndpointRerank,
+)
+from shared.utils.asyncio_utils import run_coroutine_sync
+
+REQUEST_LATENCY = float(os.environ.get("STUB_REQUEST_LATENCY", 0.08))
+PAIR_LATENCY = float(os.environ.get("STUB_PAIR_LATENCY", 0.001))
+
+
+class StubSageMakerRuntime:
+    def invoke_endpoint(self, Body, **kwargs):
+        pairs = json.loads(Body)["inputs"]
+        time.sleep(REQUEST_LATENCY + PAIR_LATENCY * len(pairs))
+        scores = [random.random() for _ in pairs]
+        return {"Body": io.BytesIO(json.dumps({"rerank_scores": scores}).encode())}
+
+
+def make_documents(count: int):
+    return [
+        Document(
+            page_content="OpenSearch hybrid retrieval chunk " * 40,
+            metadata={
+                "file_path": f"s3://bucket/doc-{i}.pdf",
+                "heading_hierarchy": {"previous": f"c{i - 1}", "next": f"c{i + 1}"},
+                "retrieval_score": random.random(),
+                "complete_heading": "Guide > Setup > Knowledge base",
+            },
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_compress(reranker, documents, query):
+    compressed = []
+    for i in range(0, len(documents), reranker.rerank_batch_size):
+        batch_documents = documents[i : i + reranker.rerank_batch_size]
+        rerank_scores = reranker.rerank(documents=batch_documents, query=query)
+        for j, doc in enumerate(batch_documents):
+            doc_copy = Document(doc.page_content, metadata=deepcopy(doc.metadata))
+            doc_copy.metadata["relevance_score"] = rerank_scores[j]
+            compressed.append(doc_copy)
+    return sorted(
+        compressed, key=lambda x: x.metadata["relevance_score"], reverse=True
+    )
+
+
+def timed(fn, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+if __name__ == "__main__":
+    document_count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    max_concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    reranker = SagemakerEndpointRerank(
+        client=StubSageMakerRuntime(),
+        endpoint_name="stub",
+        region_name="us-east-1",
+        content_handler=RerankContentHandler(),
+        rerank_batch_size=batch_size,
+        rerank_max_concurrency=max_concurrency,
+    )
+    documents = make_documents(document_count)
+    query = "how to configure the knowledge base"
+
+    legacy, _ = timed(lambda: legacy_compress(reranker, documents, query))
+
+    def cold_compress():
+        rerank_score_cache.clear()
+        return run_coroutine_sync(reranker.acompress_documents(documents, query))
+
+    batched, ranked = timed(cold_compress)
+    cached, _ = timed(
+        lambda: run_coroutine_sync(reranker.acompress_documents(documents, query))
+    )
+    print(f"{document_count} documents, batch size {batch_size}, concurrency {max_concurrency}")
+    print(f"sequential: {legacy * 1000:8.1f} ms")
+    print(f"concurrent: {batched * 1000:8.1f} ms ({legacy / batched:.1f}x)")
+    print(f"cached:     {cached * 1000:8.1f} ms ({legacy / cached:.1f}x)")
+    assert len(ranked) == document_count
@@ -0,0 +1,109 @@
+"""Benchmark the SageMaker response stream decoder on synthetic streams.
+
+A multi-MB generation is serialized as one JSON object per line and cut
+into random PayloadPart events, so lines are split across events like in a
+real response stream. The former BytesIO based LineIterator, which never
+truncates its buffer, is compared with StreamLineDecoder.
+
+    python stream_decoder_benchmark.py [megabytes] [max_event_size]
+"""
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../.."))
+
+from shared.utils.stream_utils import (
+    iter_event_stream_json,
+    iter_event_stream_lines,
+)
+
+
+class LegacyLineIterator:
+    def __init__(self, stream):
+        self.byte_iterator = iter(stream)
+        self.buffer = io.BytesIO()
+        self.read_pos = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            self.buffer.seek(self.read_pos)
+            line = self.buffer.readline()
+            if line and line[-1] == ord("\n"):
+                self.read_pos += len(line)
+                return line[:-1]
+            chunk = next(self.byte_iterator)
+            if "PayloadPart" not in chunk:
+                continue
+            self.buffer.seek(0, io.SEEK_END)
+            self.buffer.write(chunk["PayloadPart"]["Bytes"])
+
+
+def legacy_decode(events):
+    return [json.loads(line) for line in LegacyLineIterator(events)]
+
+
+def make_events(megabytes: float, max_event_size: int):
+    lines = []
+    size = 0
+    i = 0
+    while size < megabytes * 1024 * 1024:
+        line = json.dumps(
+            {"choices": [{"delta": {"content": f" token{i}"}}], "index": i}
+        ).encode() + b"\n"
+        lines.append(line)
+        size += len(line)
+        i += 1
+    payload = b"".join(lines)
+    events = []
+    pos = 0
+    while pos < len(payload):
+        step = random.randint(1, max_event_size)
+        events.append({"PayloadPart": {"Bytes": payload[pos : pos + step]}})
+        pos += step
+    return events, len(lines)
+
+
+def best_time(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def peak_memory(lines):
+    # only count the lines, so the peak is the memory of the decoder itself
+    tracemalloc.start()
+    for _ in lines:
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == "__main__":
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    max_event_size = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    random.seed(0)
+    events, line_count = make_events(megabytes, max_event_size)
+    print(f"{megabytes} MB, {line_count} lines, {len(events)} events")
+
+    legacy_time, legacy = best_time(lambda: legacy_decode(events))
+    new_time, decoded = best_time(lambda: list(iter_event_stream_json(events)))
+    assert decoded == legacy and len(decoded) == line_count
+    legacy_peak = peak_memory(LegacyLineIterator(events))
+    new_peak = peak_memory(iter_event_stream_lines(events))
+    print(f"BytesIO:  {legacy_time * 1000:8.1f} ms, peak {legacy_peak / 1024:8.1f} KiB")
+    print(
+        f"decoder:  {new_time * 1000:8.1f} ms, peak {new_peak / 1024:8.1f} KiB "
+        f"({legacy_time / new_time:.2f}x)"
+    )
@@ -1,6 +1,5 @@
 import asyncio
 import codecs
-import io
 import json
 import os
 import threading
@@ -73,6 +72,10 @@ from pydantic import BaseModel as pydantic_basemodel
 from pydantic import model_validator
 from shared.constant import LLMModelType, ModelProvider
 from shared.utils.logger_utils import get_logger
+from shared.utils.stream_utils import (
+    iter_event_stream_json,
+    iter_event_stream_lines,
+)
 
 from . import ChatModelBase
 
@@ -180,42 +183,24 @@ class LineIterator:
     {'PayloadPart': {'Bytes': b'[" problem"]}\n'}}
 
 
-    This class accounts for this by concatenating bytes written via the 'write' function
-    and then exposing a method which will return lines (ending with a '\n' character)
-    within the buffer via the 'scan_lines' function.
-    It maintains the position of the last read position to ensure
-    that previous bytes are not exposed again.
+    This class accounts for this by feeding the bytes to a
+    ``StreamLineDecoder``, which only keeps the unfinished tail of the
+    stream and returns the lines (ending with a '\n' character) as soon as
+    they are complete. The last line is returned even without a trailing
+    newline.
 
     For more details see:
     https://aws.amazon.com/blogs/machine-learning/elevating-the-generative-ai-experience-introducing-streaming-support-in-amazon-sagemaker-hosting/
     """
 
     def __init__(self, stream: Any) -> None:
-        self.byte_iterator = iter(stream)
-        self.buffer = io.BytesIO()
-        self.read_pos = 0
+        self.line_iterator = iter_event_stream_lines(stream)
 
     def __iter__(self) -> "LineIterator":
         return self
 
     def __next__(self) -> Any:
-        while True:
-            self.buffer.seek(self.read_pos)
-            line = self.buffer.readline()
-            if line and line[-1] == ord("\n"):
-                self.read_pos += len(line)
-                return line[:-1]
-            try:
-                chunk = next(self.byte_iterator)
-            except StopIteration:
-                if self.read_pos < self.buffer.getbuffer().nbytes:
-                    continue
-                raise
-            if "PayloadPart" not in chunk:
-                # Unknown Event Type
-                continue
-            self.buffer.seek(0, io.SEEK_END)
-            self.buffer.write(chunk["PayloadPart"]["Bytes"])
+        return next(self.line_iterator)
 
 
 class WaiterConfig(object):
@@ -719,9 +704,7 @@ class SageMakerClient(ClientBase):
             )
 
             def _ret_iterator_helper():
-                iterator = LineIterator(resp["Body"])
-                for line in iterator:
-                    chunk_dict = json.loads(line)
+                for chunk_dict in iter_event_stream_json(resp["Body"]):
                     if not chunk_dict:
                         continue
                     yield chunk_dict
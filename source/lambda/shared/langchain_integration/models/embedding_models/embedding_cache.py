@@ -0,0 +1,92 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, List
+
+from shared.utils.cache_utils import LRUCache
+from shared.utils.logger_utils import get_logger
+
+logger = get_logger("embedding_cache")
+
+# cross-invocation LRU of query embeddings, disabled by default
+QUERY_EMBEDDING_LRU_SIZE = int(os.environ.get("QUERY_EMBEDDING_LRU_SIZE", 0))
+QUERY_EMBEDDING_LRU_TTL = float(
+    os.environ.get("QUERY_EMBEDDING_LRU_TTL", 3600)
+)
+
+
+def get_embedding_cache_key(embedding_config: dict) -> tuple:
+    """Identify an embedding model by provider, model id and endpoint."""
+    return (
+        embedding_config.get("provider"),
+        embedding_config.get("model_id"),
+        embedding_config.get("sagemaker_endpoint_name")
+        or embedding_config.get("base_url"),
+        embedding_config.get("sagemaker_target_model"),
+    )
+
+
+class QueryEmbeddingCache:
+    """Share query embeddings between all the retrievers of one request.
+
+    QQ match, intention detection and knowledge retrieval usually embed the
+    same query with the same model, so the first retriever computes the
+    embedding and the others reuse it. Concurrent lookups of the same key
+    in one event loop wait for the in-flight call instead of issuing their
+    own. Optionally, embeddings are also kept in a bounded LRU across warm
+    invocations.
+    """
+
+    def __init__(
+        self,
+        lru_size: int = QUERY_EMBEDDING_LRU_SIZE,
+        lru_ttl: float = QUERY_EMBEDDING_LRU_TTL,
+    ):
+        self.request_memo = {}
+        self.lru = LRUCache(max_size=lru_size, ttl=lru_ttl)
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}
+
+    def reset_request(self):
+        """Drop the per-request memo, called at the start of every turn."""
+        self.request_memo.clear()
+        self._pending.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "lru": self.lru.stats()}
+
+    async def aget_embedding(
+        self,
+        model_key: tuple,
+        text: str,
+        embed_fn: Callable[[str], Awaitable[List[float]]],
+    ) -> List[float]:
+        key = (model_key, text)
+        embedding = self.request_memo.get(key)
+        if embedding is None and self.lru.max_size > 0:
+            embedding = self.lru.get(key)
+            if embedding is not None:
+                self.request_memo[key] = embedding
+        if embedding is not None:
+            self.hits += 1
+            return embedding
+
+        pending = self._pending.get(key)
+        if pending is not None and pending.get_loop() is asyncio.get_running_loop():
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        task = asyncio.ensure_future(embed_fn(text))
+        self._pending[key] = task
+        try:
+            embedding = await task
+        finally:
+            if self._pending.get(key) is task:
+                del self._pending[key]
+        self.request_memo[key] = embedding
+        self.lru.put(key, embedding)
+        return embedding
+
+
+query_embedding_cache = QueryEmbeddingCache()
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import json
+import os
+from typing import List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks.manager import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+from shared.utils.asyncio_utils import run_coroutine_sync
+from shared.utils.cache_utils import LRUCache
+from shared.utils.logger_utils import get_logger
+
+logger = get_logger("batch_rerank")
+
+# number of rerank requests of one call in flight at the same time
+RERANK_MAX_CONCURRENCY = int(os.environ.get("RERANK_MAX_CONCURRENCY", 4))
+# documents are cut to this many characters before being sent to the model
+RERANK_MAX_CHARS = int(os.environ.get("RERANK_MAX_CHARS", 1024 * 10))
+# scores of (model, query, document) pairs kept across warm invocations
+RERANK_SCORE_CACHE_SIZE = int(os.environ.get("RERANK_SCORE_CACHE_SIZE", 4096))
+RERANK_SCORE_CACHE_TTL = float(os.environ.get("RERANK_SCORE_CACHE_TTL", 600))
+
+rerank_score_cache = LRUCache(
+    max_size=RERANK_SCORE_CACHE_SIZE, ttl=RERANK_SCORE_CACHE_TTL
+)
+
+
+def normalize_rerank_query(query: str) -> str:
+    return " ".join(query.split())
+
+
+class BatchRerankBase(BaseDocumentCompressor):
+    """Common rerank flow of the SageMaker, Bedrock and EMD rerankers.
+
+    The documents are serialized and truncated once, split into batches of
+    ``rerank_batch_size`` and the batches are sent concurrently, at most
+    ``rerank_max_concurrency`` at a time. The blocking client call of a batch
+    runs in the default executor. Scores are written to the
+    ``relevance_score`` metadata of the input documents, which are returned
+    without being copied.
+
+    Scores are cached in ``rerank_score_cache`` by model, normalized query
+    and hash of the truncated document, only the uncached documents are
+    sent to the model.
+
+    Subclasses implement ``rerank_batch``.
+    """
+
+    rerank_batch_size: int = 100
+    rerank_max_concurrency: int = RERANK_MAX_CONCURRENCY
+    rerank_max_chars: Optional[int] = RERANK_MAX_CHARS
+
+    def rerank_batch(
+        self, query: str, texts: List[str]
+    ) -> List[Tuple[int, float]]:
+        """Score one batch.
+
+        Args:
+            query: the query to rank the texts against
+            texts: serialized and truncated documents
+
+        Returns:
+            (index in texts, relevance score) of the ranked texts
+        """
+        raise NotImplementedError
+
+    def get_rerank_model_key(self) -> tuple:
+        """Identify the model behind the reranker in the score cache."""
+        return (
+            type(self).__name__,
+            getattr(self, "model_id", None),
+            getattr(self, "model_tag", None),
+            getattr(self, "endpoint_name", None),
+            json.dumps(
+                getattr(self, "endpoint_kwargs", None),
+                sort_keys=True,
+                default=str,
+            ),
+        )
+
+    def serialize_documents(
+        self, documents: Sequence[Document]
+    ) -> List[str]:
+        texts = [
+            doc.page_content if isinstance(doc, Document) else doc
+            for doc in documents
+        ]
+        if self.rerank_max_chars:
+            texts = [text[: self.rerank_max_chars] for text in texts]
+        return texts
+
+    def _batch_ranges(self, size: int) -> List[Tuple[int, int]]:
+        batch_size = max(self.rerank_batch_size, 1)
+        return [
+            (start, min(start + batch_size, size))
+            for start in range(0, size, batch_size)
+        ]
+
+    @staticmethod
+    def _attach_scores(
+        documents: Sequence[Document],
+        scores: List[Tuple[int, float]],
+    ) -> List[Document]:
+        ranked_docs = []
+        for index, score in scores:
+            doc = documents[index]
+            doc.metadata["relevance_score"] = score
+            ranked_docs.append(doc)
+        ranked_docs.sort(
+            key=lambda x: x.metadata["relevance_score"], reverse=True
+        )
+        return ranked_docs
+
+    async def acompress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        if len(documents) == 0:
+            return []
+        texts = self.serialize_documents(documents)
+
+        model_key = self.get_rerank_model_key()
+        normalized_query = normalize_rerank_query(query)
+        cache_keys = [
+            (
+                model_key,
+                normalized_query,
+                hashlib.sha1(text.encode("utf-8")).hexdigest(),
+            )
+            for text in texts
+        ]
+        scores = []
+        uncached_indexes = []
+        for index, cache_key in enumerate(cache_keys):
+            score = rerank_score_cache.get(cache_key)
+            if score is None:
+                uncached_indexes.append(index)
+            else:
+                scores.append((index, score))
+        if scores:
+            logger.info(
+                f"rerank score cache hits: {len(scores)}/{len(texts)}"
+            )
+
+        if uncached_indexes:
+            uncached_texts = [texts[i] for i in uncached_indexes]
+            batch_ranges = self._batch_ranges(len(uncached_texts))
+            loop = asyncio.get_running_loop()
+            semaphore = asyncio.Semaphore(max(self.rerank_max_concurrency, 1))
+
+            async def _rerank(start: int, end: int):
+                async with semaphore:
+                    return await loop.run_in_executor(
+                        None, self.rerank_batch, query, uncached_texts[start:end]
+                    )
+
+            ranked_batches = await asyncio.gather(
+                *(_rerank(start, end) for start, end in batch_ranges)
+            )
+            for (start, _), ranked in zip(batch_ranges, ranked_batches):
+                for batch_index, score in ranked:
+                    index = uncached_indexes[start + batch_index]
+                    rerank_score_cache.put(cache_keys[index], score)
+                    scores.append((index, score))
+
+        return self._attach_scores(documents, scores)
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        return run_coroutine_sync(
+            self.acompress_documents(documents, query, callbacks=callbacks)
+        )
@@ -1,4 +1,5 @@
 from . import RerankModelBase
+from .batch_rerank import BatchRerankBase
 from shared.utils.logger_utils import get_logger
 from ..model_config import (
     BEDROCK_RERANK_CONFIGS
@@ -7,21 +8,19 @@ from shared.constant import (
     ModelProvider
 )
 import json
-from langchain_core.documents import BaseDocumentCompressor,Document
+from langchain_core.documents import Document
 import os
 import boto3 
-from typing import Any, Dict, List, Optional, Sequence, Union
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 from typing_extensions import Self
 from langchain_aws.document_compressors.rerank import BedrockRerank as _BedrockRerank
 import sys 
-from copy import deepcopy
-from langchain_core.callbacks.manager import Callbacks
 from ..model_config import BEDROCK_RERANK_CONFIGS
 logger = get_logger("bedrock_rerank_model")
 
 
-class BedrockRerank(BaseDocumentCompressor):
+class BedrockRerank(BatchRerankBase):
     client: Any = Field(default=None, exclude=True)  #: :meta private:
     """Bedrock client."""
     region_name: Optional[str] = None
@@ -44,6 +43,8 @@ class BedrockRerank(BaseDocumentCompressor):
     top_n: Optional[int] = sys.maxsize
 
     model_kwargs: Dict[str, Any] = Field(default_factory=dict)
+    # the rerank API accepts up to 1000 documents per request
+    rerank_batch_size: int = 1000
 
     model_config = ConfigDict(
         extra="forbid",
@@ -111,32 +112,13 @@ class BedrockRerank(BaseDocumentCompressor):
         results = result["results"]
         return results
 
-    def compress_documents(
-        self,
-        documents: Sequence[Document],
-        query: str,
-        callbacks: Optional[Callbacks] = None,
-    ) -> Sequence[Document]:
-        """
-        Compress documents using Bedrock's rerank API.
-
-        Args:
-            documents: A sequence of documents to compress.
-            query: The query to use for compressing the documents.
-            callbacks: Callbacks to run during the compression process.
-
-        Returns:
-            A sequence of compressed documents.
-        """
-        compressed = []
-        for res in self.rerank(documents, query):
-            doc = documents[res["index"]]
-            doc_copy = Document(doc.page_content, metadata=deepcopy(doc.metadata))
-            doc_copy.metadata["relevance_score"] = res["relevance_score"]
-            compressed.append(doc_copy)
-        return compressed
-    
-    
+    def rerank_batch(
+        self, query: str, texts: List[str]
+    ) -> List[Tuple[int, float]]:
+        return [
+            (res["index"], res["relevance_score"])
+            for res in self.rerank(texts, query)
+        ]
 
 
 class BedrockRerankBaseModel(RerankModelBase):
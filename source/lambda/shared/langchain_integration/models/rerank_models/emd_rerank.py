@@ -8,18 +8,30 @@ from shared.constant import (
 
 import boto3 
 import os
+from typing import List, Tuple
 
 from emd.integrations.langchain_clients import SageMakerVllmRerank as _SageMakerVllmRerank
 
 from ..model_config import (
     BGE_RERANK_V2_M3_CONFIGS
 )
+from .batch_rerank import BatchRerankBase
 
 session = boto3.Session()
 current_region = session.region_name
 
-class SageMakerVllmRerank(_SageMakerVllmRerank):
-    pass 
+class SageMakerVllmRerank(BatchRerankBase, _SageMakerVllmRerank):
+    """EMD rerank client behind the shared concurrent batch rerank flow"""
+
+    def rerank_batch(
+        self, query: str, texts: List[str]
+    ) -> List[Tuple[int, float]]:
+        results = self.rerank(documents=texts, query=query)
+        if results and isinstance(results[0], dict):
+            return [
+                (res["index"], res["relevance_score"]) for res in results
+            ]
+        return list(enumerate(results))
 
 
 class EmdRerankBaseModel(RerankModelBase):
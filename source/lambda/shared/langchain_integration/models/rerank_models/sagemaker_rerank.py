@@ -1,18 +1,17 @@
 import json
 import os
-from copy import deepcopy
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import boto3
 from langchain_community.llms.sagemaker_endpoint import ContentHandlerBase
-from langchain_core.callbacks.manager import Callbacks
-from langchain_core.documents import BaseDocumentCompressor, Document
+from langchain_core.documents import Document
 from langchain_core.utils import pre_init
 from pydantic import ConfigDict, Field
 from shared.constant import ModelProvider, RerankModelType
 from shared.utils.logger_utils import get_logger
 
 from . import RerankModelBase
+from .batch_rerank import BatchRerankBase
 
 logger = get_logger("sagemaker_rerank_model")
 
@@ -33,7 +32,7 @@ class RerankContentHandler(ContentHandlerBase):
         return response_json["rerank_scores"]
 
 
-class SagemakerEndpointRerank(BaseDocumentCompressor):
+class SagemakerEndpointRerank(BatchRerankBase):
     """Custom Sagemaker Inference Endpoints."""
 
     client: Any = None
@@ -86,8 +85,6 @@ class SagemakerEndpointRerank(BaseDocumentCompressor):
     function. See `boto3`_. docs for more info.
     .. _boto3: <https://boto3.amazonaws.com/v1/documentation/api/latest/index.html>
     """
-    rerank_batch_size: int = 100
-
     model_config = ConfigDict(
         arbitrary_types_allowed=True, extra="forbid", protected_namespaces=()
     )
@@ -158,31 +155,11 @@ class SagemakerEndpointRerank(BaseDocumentCompressor):
 
         return self.content_handler.transform_output(response["Body"])
 
-    def compress_documents(
-        self,
-        documents: Sequence[Document],
-        query: str,
-        callbacks: Optional[Callbacks] = None,
-    ) -> Sequence[Document]:
-        # batch documents
-        compressed = []
-        for i in range(0, len(documents), self.rerank_batch_size):
-            batch_documents = documents[i : i + self.rerank_batch_size]
-            # rerank
-            rerank_scores = self.rerank(documents=batch_documents, query=query)
-            # update rerank scores
-            for j, doc in enumerate(batch_documents):
-                doc_copy = Document(
-                    doc.page_content, metadata=deepcopy(doc.metadata)
-                )
-                doc_copy.metadata["relevance_score"] = rerank_scores[j]
-                compressed.append(doc_copy)
-
-        return sorted(
-            compressed,
-            key=lambda x: x.metadata["relevance_score"],
-            reverse=True,
-        )
+    def rerank_batch(
+        self, query: str, texts: List[str]
+    ) -> List[Tuple[int, float]]:
+        rerank_scores = self.rerank(documents=texts, query=query)
+        return list(enumerate(rerank_scores))
 
 
 class SageMakerMultiModelRerankModelBase(RerankModelBase):
@@ -12,6 +12,7 @@ from langchain.docstore.document import Document
 from langchain.schema.retriever import BaseRetriever
 from common_logic.langchain_integration.models import EmbeddingModel
 # from sm_utils import SagemakerEndpointVectorOrCross
+from shared.utils.asyncio_utils import run_coroutine_sync
 from common_logic.common_utils.logger_utils import get_logger
 from .aos_utils import LLMBotOpenSearchClient
 
@@ -606,7 +607,7 @@ class QueryDocumentKNNRetriever(BaseRetriever):
                     if doc:
                         result["doc"] = doc
             else:
-                response_list = asyncio.run(
+                response_list = run_coroutine_sync(
                     self.__spawn_task(aos_hits, context_size))
                 for context, result in zip(response_list, results):
                     result["doc"] = "\n".join(
@@ -770,7 +771,7 @@ class QueryDocumentBM25Retriever(BaseRetriever):
                 if doc:
                     result["doc"] = doc
         else:
-            response_list = asyncio.run(
+            response_list = run_coroutine_sync(
                 self.__spawn_task(aos_hits, context_size))
             for context, result in zip(response_list, results):
                 result["doc"] = "\n".join(
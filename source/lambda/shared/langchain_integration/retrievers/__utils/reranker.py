@@ -1,4 +1,5 @@
 from sm_utils import SagemakerEndpointVectorOrCross
+from shared.utils.asyncio_utils import run_coroutine_sync
 from langchain.retrievers.document_compressors.base import BaseDocumentCompressor
 from langchain.schema import Document
 from langchain.callbacks.manager import Callbacks
@@ -77,7 +78,7 @@ class BGEM3Reranker(BaseDocumentCompressor):
         score_list = []
         logger.info(
             f'rerank pair num {len(query_colbert_list)}, m3 method: colbert score')
-        score_list = asyncio.run(self.__spawn_task(
+        score_list = run_coroutine_sync(self.__spawn_task(
             query_colbert_list, doc_colbert_list))
         final_results = []
         debug_info = query["debug_info"]
@@ -170,7 +171,7 @@ class BGEReranker(BaseDocumentCompressor):
         score_list = []
         logger.info(
             f'rerank pair num {len(rerank_pair)}, endpoint_name: {self.rerank_model_endpoint}')
-        response_list = asyncio.run(self.__spawn_task(rerank_pair))
+        response_list = run_coroutine_sync(self.__spawn_task(rerank_pair))
         for response in response_list:
             score_list.extend(json.loads(response))
         final_results = []
@@ -1,6 +1,9 @@
+import asyncio
 import hashlib
 import json
 import os
+import threading
+import time
 import traceback
 import uuid
 from typing import Any, Iterable, List, Optional, Tuple, Union
@@ -14,19 +17,21 @@ from langchain_community.vectorstores.opensearch_vector_search import (
 )
 from langchain_core.pydantic_v1 import Field
 from pydantic import BaseModel, Field
+from shared.utils.asyncio_utils import background_event_loop
 from shared.utils.logger_utils import get_logger
 
 aosEndpoint = os.environ.get("AOS_ENDPOINT")
 aos_secret = os.environ.get("AOS_SECRET_NAME", "opensearch-master-user")
+aos_credential_ttl = int(os.environ.get("AOS_CREDENTIAL_TTL", 3600))
 region = os.environ["AWS_REGION"]
 logger = get_logger(__name__)
 
 
-def get_client_kwargs():
+def get_client_kwargs(secret_name: str = aos_secret):
     secrets_manager_client = boto3.client("secretsmanager")
     try:
         master_user = secrets_manager_client.get_secret_value(
-            SecretId=aos_secret
+            SecretId=secret_name
         )["SecretString"]
         cred = json.loads(master_user)
         username = cred.get("username")
@@ -43,11 +48,97 @@ def get_client_kwargs():
     except secrets_manager_client.exceptions.InvalidRequestException:
         logger.info("Using IAM authentication to connect to OpenSearch Domain")
     except Exception as e:
-        logger.error(f"Error retrieving secret '{aos_secret}': {str(e)}")
+        logger.error(f"Error retrieving secret '{secret_name}': {str(e)}")
         raise
     return {}
 
 
+def _in_foreign_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return not background_event_loop.is_current()
+
+
+class OpenSearchClientPool:
+    """Process-wide pool of OpenSearch clients keyed by endpoint and secret.
+
+    Warm Lambda containers reuse the credentials, the sync and async
+    clients and the set of indexes already verified by ``create_index``, so
+    only the first turn of a container pays the Secrets Manager call, the
+    TLS handshakes and the index check.
+    Credentials are fetched again once ``credential_ttl`` seconds have
+    passed, and the clients are rebuilt only if the credentials changed.
+    """
+
+    def __init__(self, credential_ttl: int = aos_credential_ttl):
+        self.credential_ttl = credential_ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._verified_indexes = set()
+
+    def _get_entry(self, opensearch_url: str, secret_name: str) -> dict:
+        key = (opensearch_url, secret_name)
+        with self._lock:
+            now = time.time()
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and now - entry["fetched_at"] < self.credential_ttl
+            ):
+                return entry
+            client_kwargs = get_client_kwargs(secret_name)
+            if entry is not None and entry["client_kwargs"] == client_kwargs:
+                entry["fetched_at"] = now
+                return entry
+            logger.info(f"Creating OpenSearch client for {opensearch_url}")
+            entry = {
+                "client_kwargs": client_kwargs,
+                "client": _get_opensearch_client(
+                    opensearch_url, **client_kwargs
+                ),
+                "async_client": _get_async_opensearch_client(
+                    opensearch_url, **client_kwargs
+                ),
+                "fetched_at": now,
+            }
+            self._entries[key] = entry
+            return entry
+
+    def get_clients(
+        self, opensearch_url: str, secret_name: str = aos_secret
+    ) -> Tuple[dict, Any, Any]:
+        """Return ``(client_kwargs, client, async_client)`` for the endpoint."""
+        entry = self._get_entry(opensearch_url, secret_name)
+        # the aiohttp session of the async client is bound to the event loop
+        # it is first used in. The pooled one lives on the background event
+        # loop, callers already running in another loop get their own.
+        async_client = entry["async_client"]
+        if _in_foreign_event_loop():
+            async_client = _get_async_opensearch_client(
+                opensearch_url, **entry["client_kwargs"]
+            )
+        return entry["client_kwargs"], entry["client"], async_client
+
+    def is_index_verified(self, opensearch_url: str, index_name: str) -> bool:
+        return (opensearch_url, index_name) in self._verified_indexes
+
+    def mark_index_verified(self, opensearch_url: str, index_name: str):
+        self._verified_indexes.add((opensearch_url, index_name))
+
+    def forget_index(self, opensearch_url: str, index_name: str):
+        self._verified_indexes.discard((opensearch_url, index_name))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._verified_indexes.clear()
+
+
+opensearch_client_pool = OpenSearchClientPool()
+
+
 class OpenSearchBase(BaseModel):
     opensearch_url: Union[str, None] = None
     index_name: str
@@ -75,15 +166,21 @@ class OpenSearchBase(BaseModel):
                 self.client,
                 self.async_client,
             )
-            self.client_kwargs = get_client_kwargs()
-            self.client = _get_opensearch_client(
-                self.opensearch_url, **self.client_kwargs
-            )
-            self.async_client = _get_async_opensearch_client(
-                self.opensearch_url, **self.client_kwargs
-            )
+            (
+                self.client_kwargs,
+                self.client,
+                self.async_client,
+            ) = opensearch_client_pool.get_clients(self.opensearch_url)
         self.is_aoss = _is_aoss_enabled(http_auth=self.http_auth)
-        self.create_index()
+        if self.opensearch_url is None:
+            self.create_index()
+        elif not opensearch_client_pool.is_index_verified(
+            self.opensearch_url, self.index_name
+        ):
+            self.create_index()
+            opensearch_client_pool.mark_index_verified(
+                self.opensearch_url, self.index_name
+            )
 
     def create_index(self):
         raise NotImplemented
@@ -96,6 +193,7 @@ class OpenSearchBase(BaseModel):
             index_name = self.index_name
         try:
             self.client.indices.delete(index=index_name)
+            opensearch_client_pool.forget_index(self.opensearch_url, index_name)
             return True
         except Exception as e:
             raise e
@@ -223,6 +321,24 @@ class OpenSearchBase(BaseModel):
             index=self.index_name, body=query_dict
         )
 
+    def _build_msearch_body(self, query_dicts: List[dict]) -> List[dict]:
+        body = []
+        for query_dict in query_dicts:
+            body.append({"index": self.index_name})
+            body.append(query_dict)
+        return body
+
+    def msearch(self, query_dicts: List[dict]) -> List[dict]:
+        """Run several searches in one request, one response per query."""
+        res = self.client.msearch(body=self._build_msearch_body(query_dicts))
+        return res["responses"]
+
+    async def amsearch(self, query_dicts: List[dict]) -> List[dict]:
+        res = await self.async_client.msearch(
+            body=self._build_msearch_body(query_dicts)
+        )
+        return res["responses"]
+
 
 class OpenSearchBM25Search(OpenSearchBase):
     k1: float = 1.2
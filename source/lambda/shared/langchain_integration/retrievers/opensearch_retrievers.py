@@ -2,9 +2,12 @@ from langchain_core.retrievers import BaseRetriever
 from .databases.opensearch import OpenSearchHybridSearch
 from langchain_core.embeddings import Embeddings
 from langchain_core.documents import BaseDocumentCompressor
-from ..models.embedding_models import EmbeddingModel
+from ..models.embedding_models.embedding_cache import (
+    get_embedding_cache_key,
+    query_embedding_cache
+)
 from typing import Any, Dict, List, Union,Tuple
-from ..models.rerank_models import RerankModel
+from .retriever_registry import retriever_registry
 from pydantic import Field  
 from langchain.docstore.document import Document
 from langchain.callbacks.manager import (
@@ -12,6 +15,7 @@ from langchain.callbacks.manager import (
     AsyncCallbackManagerForRetrieverRun
 )
 import traceback
+from shared.utils.asyncio_utils import run_coroutine_sync
 from shared.utils.logger_utils import get_logger
 from shared.constant import ContextExtendMethod,Threshold
 import asyncio
@@ -39,6 +43,8 @@ class OpensearchHybridRetrieverBase(BaseRetriever):
     enable_vector_search:bool = True
 
     rerank_top_k:Union[int,None] = None
+    # identifies the embedding model in the query embedding cache
+    embedding_cache_key:Union[tuple,None] = None
     # search_params: dict = Field(default=dict)
 
     @classmethod
@@ -48,22 +54,19 @@ class OpensearchHybridRetrieverBase(BaseRetriever):
         rerank_config: dict = None,
         **kwargs
     ):
-        database = OpenSearchHybridSearch(
+        # database and models are reused across warm invocations
+        database = retriever_registry.get_database(
+            OpenSearchHybridSearch,
             embedding_dimension=embedding_config['embedding_dimension'],
             **kwargs,
         )
-        embeddings = EmbeddingModel.get_model(
-            **embedding_config
-        )
-        reranker = None
-        if rerank_config is not None:
-            reranker = RerankModel.get_model(
-                **rerank_config
-            )
+        embeddings = retriever_registry.get_embeddings(embedding_config)
+        reranker = retriever_registry.get_reranker(rerank_config)
         return cls(
             database=database,
             embeddings=embeddings,
             reranker=reranker,
+            embedding_cache_key=get_embedding_cache_key(embedding_config),
             **kwargs
             # search_params=search_params
         )
@@ -182,7 +185,13 @@ class OpensearchHybridRetrieverBase(BaseRetriever):
         return results
 
     async def _aget_embedding(self,query:str):
-        return await self.embeddings.aembed_query(query)
+        if self.embedding_cache_key is None:
+            return await self.embeddings.aembed_query(query)
+        return await query_embedding_cache.aget_embedding(
+            self.embedding_cache_key,
+            query,
+            self.embeddings.aembed_query
+        )
 
 
     async def acompress_documents(self,query,output_docs:list[Document],**kwargs):
@@ -190,6 +199,8 @@ class OpensearchHybridRetrieverBase(BaseRetriever):
         bm25_search_top_k = kwargs.get('bm25_search_top_k', self.bm25_search_top_k)
         vector_search_top_k = kwargs.get('vector_search_top_k', self.vector_search_top_k)
         rerank_top_k = rerank_top_k or bm25_search_top_k + vector_search_top_k
+        # bm25 and vector search often return the same chunk, score it once
+        output_docs = self.docs_filter(output_docs)
         compressed_output_docs = await self.reranker.acompress_documents(
             documents=output_docs, 
             query=query
@@ -293,79 +304,73 @@ class OpensearchHybridRetrieverBase(BaseRetriever):
             run_manager: AsyncCallbackManagerForRetrieverRun,
             **kwargs
         ) -> List[Document]:
-        return asyncio.run(self._aget_relevant_documents(query, run_manager=run_manager, **kwargs))
+        return run_coroutine_sync(self._aget_relevant_documents(query, run_manager=run_manager, **kwargs))
 
         
 
 class OpensearchHybridQueryDocumentRetriever(OpensearchHybridRetrieverBase):
-    
+
+    def _hit_to_document(self, hit:dict) -> Document:
+        return Document(
+            page_content=hit["_source"][self.database.text_field],
+            metadata={
+                **hit["_source"]["metadata"],
+            },
+        )
+
+    async def amget_chunks(self, chunk_ids:List[str]) -> Dict[str,dict]:
+        """
+        fetch the best hit of each chunk id with a single msearch request
+        """
+        chunk_ids = list(dict.fromkeys(chunk_ids))
+        if not chunk_ids:
+            return {}
+        responses = await self.database.amsearch([
+            self._build_exact_search_query(
+                query_term=chunk_id,
+                field="metadata.chunk_id",
+                size=1
+            )
+            for chunk_id in chunk_ids
+        ])
+        chunks = {}
+        for chunk_id, response in zip(chunk_ids, responses):
+            hits = response.get("hits", {}).get("hits", [])
+            if len(hits) > 0:
+                chunks[chunk_id] = hits[0]
+        return chunks
+
     async def aget_sibling_context(self, chunk_id, window_size)-> Tuple[List[Document],List[Document]]:
         next_content_list:List[Document] = []
         previous_content_list:List[Document] = []
-        previous_pos = 0
-        next_pos = 0
         chunk_id_prefix = "-".join(chunk_id.split("-")[:-1])
         section_id = int(chunk_id.split("-")[-1])
-        previous_section_id = section_id
-        next_section_id = section_id
-        while previous_pos < window_size:
-            previous_section_id -= 1
-            if previous_section_id < 1:
-                break
-            previous_chunk_id = f"{chunk_id_prefix}-{previous_section_id}"
-            opensearch_query_response = await self.database.asearch(
-                self._build_exact_search_query(
-                    query_term=previous_chunk_id,
-                    field="metadata.chunk_id",
-                    size=1
-                )
-                # index_name=index_name,
-                # query_type="basic",
-                # query_term=previous_chunk_id,
-                # field="metadata.chunk_id",
-                # size=1,
+        # section ids start from 1, the walk stops at the first missing chunk
+        previous_chunk_ids = [
+            f"{chunk_id_prefix}-{previous_section_id}"
+            for previous_section_id in range(
+                section_id - 1, max(section_id - 1 - window_size, 0), -1
             )
-            if len(opensearch_query_response["hits"]["hits"]) > 0:
-                r = opensearch_query_response["hits"]["hits"][0]
-                previous_content_list.insert(0,Document(
-                    page_content=r["_source"][self.database.text_field],
-                    metadata={
-                        **r["_source"]["metadata"]
-                    },
-                )
-                )
-                # previous_content_list.insert(0, r["_source"]["text"])
-                previous_pos += 1
-            else:
+        ]
+        next_chunk_ids = [
+            f"{chunk_id_prefix}-{next_section_id}"
+            for next_section_id in range(
+                section_id + 1, section_id + 1 + window_size
+            )
+        ]
+        chunks = await self.amget_chunks(previous_chunk_ids + next_chunk_ids)
+        for previous_chunk_id in previous_chunk_ids:
+            if previous_chunk_id not in chunks:
                 break
-        while next_pos < window_size:
-            next_section_id += 1
-            next_chunk_id = f"{chunk_id_prefix}-{next_section_id}"
-            opensearch_query_response = await self.database.asearch(
-                self._build_exact_search_query(
-                    query_term=next_chunk_id,
-                    field="metadata.chunk_id",
-                    size=1
-                )
-            
-                # index_name=index_name,
-                # query_type="basic",
-                # query_term=next_chunk_id,
-                # field="metadata.chunk_id",
-                # size=1,
+            previous_content_list.insert(
+                0, self._hit_to_document(chunks[previous_chunk_id])
             )
-            if len(opensearch_query_response["hits"]["hits"]) > 0:
-                r = opensearch_query_response["hits"]["hits"][0]
-                next_content_list.append(Document(
-                    page_content=r["_source"][self.database.text_field],
-                    metadata={
-                        **r["_source"]["metadata"],
-                    },
-                )
-                )
-                next_pos += 1
-            else:
+        for next_chunk_id in next_chunk_ids:
+            if next_chunk_id not in chunks:
                 break
+            next_content_list.append(
+                self._hit_to_document(chunks[next_chunk_id])
+            )
         return [previous_content_list, next_content_list]
 
 
@@ -390,64 +395,46 @@ class OpensearchHybridQueryDocumentRetriever(OpensearchHybridRetrieverBase):
 
         if "heading_hierarchy" not in doc.metadata:
             return [previous_content_list, next_content_list]
-        if "previous" in doc.metadata["heading_hierarchy"]:
-            previous_chunk_id = doc.metadata["heading_hierarchy"][
-                "previous"
-            ]
-            previous_pos = 0
-            while (
+        heading_hierarchy = doc.metadata["heading_hierarchy"]
+        previous_chunk_id = heading_hierarchy.get("previous")
+        next_chunk_id = heading_hierarchy.get("next")
+        previous_pos = 0
+        next_pos = 0
+        # both heading chains are followed together, one msearch per step
+        while True:
+            walk_previous = bool(
                 previous_chunk_id
                 and previous_chunk_id.startswith("$")
                 and previous_pos < window_size
-            ):
-                opensearch_query_response = await self.database.asearch(
-                    self._build_exact_search_query(
-                        query_term=previous_chunk_id,
-                        field="metadata.chunk_id",
-                        size=1
-                )
-                )
-                if len(opensearch_query_response["hits"]["hits"]) > 0:
-                    r = opensearch_query_response["hits"]["hits"][0]
+            )
+            walk_next = bool(
+                next_chunk_id
+                and next_chunk_id.startswith("$")
+                and next_pos < window_size
+            )
+            if not (walk_previous or walk_next):
+                break
+            chunks = await self.amget_chunks(
+                [previous_chunk_id] * walk_previous + [next_chunk_id] * walk_next
+            )
+            if walk_previous:
+                if previous_chunk_id in chunks:
+                    r = chunks[previous_chunk_id]
                     previous_chunk_id = r["_source"]["metadata"]["heading_hierarchy"][
                         "previous"
                     ]
-                    previous_content_list.insert(0,Document(
-                        page_content=r["_source"][self.database.text_field],
-                        metadata={
-                            **r["_source"]["metadata"],
-                        },
-                    )
-                    )
+                    previous_content_list.insert(0, self._hit_to_document(r))
                     previous_pos += 1
                 else:
-                    break
-        if "next" in doc.metadata["heading_hierarchy"]:
-            next_chunk_id = doc.metadata["heading_hierarchy"]["next"]
-            next_pos = 0
-            while (
-                next_chunk_id and next_chunk_id.startswith(
-                    "$") and next_pos < window_size
-            ):
-                opensearch_query_response = await self.database.asearch(
-                    self._build_exact_search_query(
-                        query_term=next_chunk_id,
-                        field="metadata.chunk_id",
-                        size=1
-                )
-                )
-                if len(opensearch_query_response["hits"]["hits"]) > 0:
-                    r = opensearch_query_response["hits"]["hits"][0]
+                    previous_chunk_id = None
+            if walk_next:
+                if next_chunk_id in chunks:
+                    r = chunks[next_chunk_id]
                     next_chunk_id = r["_source"]["metadata"]["heading_hierarchy"]["next"]
-                    next_content_list.append(Document(
-                        page_content=r["_source"][self.database.text_field],
-                        metadata={
-                            **r["_source"]["metadata"],
-                        })
-                    )
+                    next_content_list.append(self._hit_to_document(r))
                     next_pos += 1
                 else:
-                    break
+                    next_chunk_id = None
         return [previous_content_list, next_content_list]
 
     
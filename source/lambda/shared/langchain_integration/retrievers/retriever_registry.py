@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+from typing import Any, Union
+
+from shared.utils.cache_utils import LRUCache
+from shared.utils.logger_utils import get_logger
+
+from ..models.embedding_models import EmbeddingModel
+from ..models.rerank_models import RerankModel
+from .databases.opensearch import _in_foreign_event_loop, aos_credential_ttl
+
+logger = get_logger("retriever_registry")
+
+RETRIEVER_REGISTRY_SIZE = int(os.environ.get("RETRIEVER_REGISTRY_SIZE", 32))
+# models may read api keys from secrets, rebuild them from time to time
+RETRIEVER_REGISTRY_MODEL_TTL = float(
+    os.environ.get("RETRIEVER_REGISTRY_MODEL_TTL", 3600)
+)
+
+
+def get_config_fingerprint(config: Union[dict, None]) -> Union[str, None]:
+    """Stable hash of a (nested) config dict, None for an empty config."""
+    if config is None:
+        return None
+    normalized = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class RetrieverRegistry:
+    """Process-wide registry of the objects a retriever is built from.
+
+    Building a retriever from its config creates boto3 clients for the
+    embedding and rerank models, loads the model modules and validates the
+    OpenSearch database. These objects only depend on the config, so warm
+    containers keep them in LRU caches keyed by a config fingerprint. The
+    retriever itself is a light pydantic object and is created on every
+    call, so per-request kwargs such as top_k or thresholds are still
+    validated and never leak between requests.
+
+    Args:
+        max_size (int): entries kept per cache, 0 disables the registry
+        model_ttl (float): seconds embedding and rerank models are kept
+    """
+
+    def __init__(
+        self,
+        max_size: int = RETRIEVER_REGISTRY_SIZE,
+        model_ttl: float = RETRIEVER_REGISTRY_MODEL_TTL,
+    ):
+        # databases hold the pooled clients, drop them when the pool may have
+        # rotated its credentials
+        self.databases = LRUCache(max_size=max_size, ttl=aos_credential_ttl)
+        self.embeddings = LRUCache(max_size=max_size, ttl=model_ttl)
+        self.rerankers = LRUCache(max_size=max_size, ttl=model_ttl)
+
+    def get_database(self, database_cls, embedding_dimension: int, **kwargs):
+        # only the fields of the database take part in the key, the search
+        # params passed along with them do not change the database
+        database_kwargs = {
+            k: v for k, v in kwargs.items() if k in database_cls.model_fields
+        }
+        key = (
+            database_cls.__name__,
+            embedding_dimension,
+            get_config_fingerprint(database_kwargs),
+        )
+        database = self.databases.get(key)
+        if database is None:
+            database = database_cls(
+                embedding_dimension=embedding_dimension, **kwargs
+            )
+            # a database built inside another event loop got a private
+            # async client bound to that loop
+            if not _in_foreign_event_loop():
+                self.databases.put(key, database)
+        return database
+
+    def get_embeddings(self, embedding_config: dict) -> Any:
+        key = get_config_fingerprint(embedding_config)
+        embeddings = self.embeddings.get(key)
+        if embeddings is None:
+            logger.info(
+                f"Creating embedding model {embedding_config.get('model_id')}"
+            )
+            embeddings = EmbeddingModel.get_model(**embedding_config)
+            self.embeddings.put(key, embeddings)
+        return embeddings
+
+    def get_reranker(self, rerank_config: Union[dict, None]) -> Any:
+        if rerank_config is None:
+            return None
+        key = get_config_fingerprint(rerank_config)
+        reranker = self.rerankers.get(key)
+        if reranker is None:
+            logger.info(
+                f"Creating rerank model {rerank_config.get('model_id')}"
+            )
+            reranker = RerankModel.get_model(**rerank_config)
+            self.rerankers.put(key, reranker)
+        return reranker
+
+    def stats(self) -> dict:
+        return {
+            "databases": self.databases.stats(),
+            "embeddings": self.embeddings.stats(),
+            "rerankers": self.rerankers.stats(),
+        }
+
+    def clear(self):
+        self.databases.clear()
+        self.embeddings.clear()
+        self.rerankers.clear()
+
+
+retriever_registry = RetrieverRegistry()
@@ -4,7 +4,7 @@ from shared.constant import (
     LLMTaskType,
     Threshold
 )
-import asyncio
+from shared.utils.asyncio_utils import run_coroutine_sync
 from shared.utils.lambda_invoke_utils import send_trace
 from shared.langchain_integration.retrievers import OpensearchHybridQueryDocumentRetriever
 from shared.langchain_integration.chains import LLMChain
@@ -19,71 +19,138 @@ from shared.langchain_integration.models.chat_models import (
 
 logger = get_logger(__name__)
 
+REFERENCE_TAG_START = "<reference>"
+REFERENCE_TAG_END = "</reference>"
+# longer tag bodies are not reference numbers, they are emitted as text
+REFERENCE_TAG_MAX_CONTENT = 32
+
+
+class ReferenceTagFilter:
+    """
+    Incremental remover of <reference>N</reference> tags from a text stream
+    Tags may span any number of chunks. Only a possible tag start at the end
+    of a chunk or the body of an open tag is held back, everything else is
+    returned with the chunk it came in, so the work per chunk is linear in
+    its length.
+    """
+
+    def __init__(self):
+        self.references = []
+        self._pending = ""
+        self._in_tag = False
+
+    def _add_reference(self, ref_content: str):
+        try:
+            self.references.append(int(ref_content))
+        except ValueError:
+            logger.warning(f"Invalid reference number: {ref_content}")
+
+    @staticmethod
+    def _partial_tag_start(text: str, pos: int) -> int:
+        # length of the longest suffix of text[pos:] which starts a tag
+        lt = text.rfind("<", max(pos, len(text) - len(REFERENCE_TAG_START) + 1))
+        if lt != -1 and REFERENCE_TAG_START.startswith(text[lt:]):
+            return len(text) - lt
+        return 0
+
+    def feed(self, chunk: str) -> str:
+        """
+        Filter the next chunk
+        Args:
+            chunk: next part of the LLM response
+        Returns:
+            text of the stream which is known to be outside of tags
+        """
+        if not self._pending:
+            if not self._in_tag and "<" not in chunk:
+                return chunk
+            text = chunk
+        else:
+            text = self._pending + chunk
+            self._pending = ""
+        output = []
+        pos = 0
+        while True:
+            if self._in_tag:
+                window = REFERENCE_TAG_MAX_CONTENT + len(REFERENCE_TAG_END)
+                end = text.find(REFERENCE_TAG_END, pos, pos + window)
+                if end == -1:
+                    if len(text) - pos >= window:
+                        # not a reference tag, keep the text after it
+                        output.append(REFERENCE_TAG_START)
+                        self._in_tag = False
+                        continue
+                    self._pending = text[pos:]
+                    break
+                self._add_reference(text[pos:end])
+                pos = end + len(REFERENCE_TAG_END)
+                self._in_tag = False
+                continue
+            start = text.find(REFERENCE_TAG_START, pos)
+            if start == -1:
+                keep = self._partial_tag_start(text, pos)
+                output.append(text[pos:len(text) - keep])
+                if keep:
+                    self._pending = text[len(text) - keep:]
+                break
+            output.append(text[pos:start])
+            pos = start + len(REFERENCE_TAG_START)
+            self._in_tag = True
+        return "".join(output)
+
+    def flush(self) -> str:
+        """Return the held back text of an unterminated tag at the end of the stream"""
+        text = REFERENCE_TAG_START + self._pending if self._in_tag else self._pending
+        self._pending = ""
+        self._in_tag = False
+        return text
+
+
+def update_reference_state(references: List[int], state: dict):
+    state["extra_response"]["references"] = references
+    all_docs:List[Document] = state["extra_response"]["docs"]
+    ref_docs = []
+    ref_figures = []
+
+    for ref in references:
+        try:
+            doc_id = ref
+            ref_docs.append(all_docs[doc_id-1])
+            ref_figures.extend(all_docs[doc_id-1].metadata.get("figure", []))
+        except Exception as e:
+            logger.error(f"Invalid reference doc id: {ref}. Error: {e}")
+
+    # Remove duplicate figures
+    unique_set = {tuple(d.items()) for d in ref_figures}
+    unique_figure_list = [dict(t) for t in unique_set]
+    state["extra_response"]["ref_docs"] = ref_docs
+    state["extra_response"]["ref_figures"] = unique_figure_list
+
+
 def filter_response(res: Iterable, state: dict):
     """
     Filter out reference tags from the response and store reference numbers
     Args:
-        res: Generator object from LLM response
+        res: Generator object from LLM response, or the whole response string
         state: State dictionary to store references
     Returns:
-        Generator yielding filtered response
+        Generator yielding filtered response, one item per non-empty input chunk
     """
-    buffer = ""
-    references = []
-    tag_start = "<reference>"
-    tag_end = "</reference>"
-    
-    for char in res:
-        char_strip = char.strip()
-        if not buffer and char_strip not in ["<", "<reference"]:
-            yield char
-            continue
-
-        buffer += char
-
-        # Check the string starts with <reference>
-        if buffer.strip() == tag_start[:len(buffer.strip())]:
-            continue
-        elif buffer.startswith(tag_start):
-            buffer = buffer.strip()
-            if buffer.endswith(tag_end):
-                # Get reference document number after finding </reference>
-                ref_content = buffer[len(tag_start):-len(tag_end)]
-                try:
-                    ref_num = int(ref_content)
-                    references.append(ref_num)
-                except ValueError:
-                    logger.warning(f"Invalid reference number: {ref_content}")
-                buffer = ""
-            continue
-        else:
-            # Move next
-            yield buffer[0]
-            buffer = buffer[1:]
-
-    if buffer:
-        yield buffer
-
-    if references:
-        state["extra_response"]["references"] = references
-        all_docs:List[Document] = state["extra_response"]["docs"]
-        ref_docs = []
-        ref_figures = []
+    if isinstance(res, str):
+        res = (res,)
+    tag_filter = ReferenceTagFilter()
 
-        for ref in references:
-            try:
-                doc_id = ref
-                ref_docs.append(all_docs[doc_id-1])
-                ref_figures.extend(all_docs[doc_id-1].metadata.get("figure", []))
-            except Exception as e:
-                logger.error(f"Invalid reference doc id: {ref}. Error: {e}")
+    for chunk in res:
+        filtered = tag_filter.feed(chunk)
+        if filtered:
+            yield filtered
 
-        # Remove duplicate figures
-        unique_set = {tuple(d.items()) for d in ref_figures}
-        unique_figure_list = [dict(t) for t in unique_set]
-        state["extra_response"]["ref_docs"] = ref_docs
-        state["extra_response"]["ref_figures"] = unique_figure_list
+    tail = tag_filter.flush()
+    if tail:
+        yield tail
 
+    if tag_filter.references:
+        update_reference_state(tag_filter.references, state)
 
 
 def format_retrieved_context(retrieved_context:Document)->List[str]:
@@ -127,7 +194,7 @@ def rag_tool(retriever_config: dict, query=None):
     # qd_retriever = OpensearchHybridQueryDocumentRetriever.from_config(
     #     **retriever_params
     # )
-    retrieved_contexts:List[Document] = asyncio.run(
+    retrieved_contexts:List[Document] = run_coroutine_sync(
         qd_retriever.ainvoke(retriever_params["query"])
     )
 
@@ -1,3 +1,69 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Union
+
 
 async def run_coroutine_task(task):
     return await task
+
+
+class BackgroundEventLoop:
+    """A process-wide event loop running forever in a daemon thread.
+
+    ``asyncio.run`` creates and closes a new loop on every call, which drops
+    the aiohttp sessions of the async clients bound to that loop. Running
+    every coroutine of the process on this loop instead keeps those
+    sessions, and their connections, alive across warm Lambda invocations.
+    The loop is started on first use.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="background-event-loop",
+                    daemon=True,
+                )
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def is_current(self) -> bool:
+        """Whether the caller is running inside the background loop."""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def run(self, coro: Awaitable, timeout: Union[float, None] = None) -> Any:
+        """Run a coroutine on the background loop and wait for its result.
+
+        Args:
+            coro (Awaitable): the coroutine to run
+            timeout (float, optional): seconds to wait, None waits forever
+        """
+        if self.is_current():
+            coro.close()
+            raise RuntimeError(
+                "run_coroutine_sync cannot be called from a coroutine running "
+                "on the background event loop, await the coroutine instead"
+            )
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+
+background_event_loop = BackgroundEventLoop()
+
+
+def run_coroutine_sync(coro: Awaitable, timeout: Union[float, None] = None) -> Any:
+    """Sync bridge to the background event loop, use it instead of asyncio.run."""
+    return background_event_loop.run(coro, timeout=timeout)
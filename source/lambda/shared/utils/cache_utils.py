@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Union
+
+_MISSING = object()
+
+
+class LRUCache:
+    """A small thread-safe LRU cache with an optional per-entry TTL.
+
+    Lambda containers are reused across invocations, so module level
+    instances of this class live as long as the warm container.
+
+    Args:
+        max_size (int): maximum number of entries, 0 disables the cache
+        ttl (float, optional): seconds an entry stays valid, None means forever
+    """
+
+    def __init__(self, max_size: int = 128, ttl: Union[float, None] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expire_at = item
+                if expire_at is None or expire_at > time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        expire_at = None if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expire_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            return False
+        return item[1] is None or item[1] > time.time()
+
+    def __len__(self) -> int:
+        return len(self._data)
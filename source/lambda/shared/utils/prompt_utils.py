@@ -7,10 +7,15 @@ from collections import defaultdict
 from shared.constant import LLMModelType, LLMTaskType
 import copy
 from shared.constant import SceneType, MessageType
+from shared.utils.cache_utils import LRUCache
 
 ddb_prompt_table_name = os.environ.get("PROMPT_TABLE_NAME", "")
 dynamodb_resource = boto3.resource("dynamodb")
 ddb_prompt_table = dynamodb_resource.Table(ddb_prompt_table_name)
+# prompt items read from ddb are kept for PROMPT_TEMPLATE_CACHE_TTL seconds,
+# prompt edits reach warm lambdas once their cached item expires
+PROMPT_TEMPLATE_CACHE_SIZE = int(os.environ.get("PROMPT_TEMPLATE_CACHE_SIZE", 256))
+PROMPT_TEMPLATE_CACHE_TTL = float(os.environ.get("PROMPT_TEMPLATE_CACHE_TTL", 60))
 
 
 # export models to front
@@ -74,6 +79,11 @@ class PromptTemplate(BaseModel):
 class PromptTemplateManager:
     def __init__(self) -> None:
         self.prompt_templates = defaultdict(dict)
+        # (group_name, model_id, scene, chatbot_id) -> prompts of all task types
+        self.ddb_prompt_cache = LRUCache(
+            max_size=PROMPT_TEMPLATE_CACHE_SIZE,
+            ttl=PROMPT_TEMPLATE_CACHE_TTL
+        )
 
     def get_prompt_template_id(self, model_id, task_type):
         return f"{model_id}__{task_type}"
@@ -115,11 +125,18 @@ class PromptTemplateManager:
                 f'prompt_template_id: {prompt_template_id}, prompt_name: {prompt_name}')
 
     def get_prompt_templates_from_ddb(self, group_name: str, model_id: str, task_type: str, chatbot_id: str = "admin", scene: str = "common"):
-        response = ddb_prompt_table.get_item(
-            Key={"GroupName": group_name,
-                 "SortKey": f"{model_id}__{scene}__{chatbot_id}"}
-        )
-        return response.get("Item", {}).get("Prompt", {}).get(task_type, {})
+        cache_key = (group_name, model_id, scene, chatbot_id)
+        prompts = self.ddb_prompt_cache.get(cache_key)
+        if prompts is None:
+            response = ddb_prompt_table.get_item(
+                Key={"GroupName": group_name,
+                     "SortKey": f"{model_id}__{scene}__{chatbot_id}"}
+            )
+            # keep every task type of the item, other tasks of the turn
+            # read the same item
+            prompts = response.get("Item", {}).get("Prompt", {}) or {}
+            self.ddb_prompt_cache.put(cache_key, prompts)
+        return dict(prompts.get(task_type, {}))
 
     def get_all_templates(self, allow_model_ids=EXPORT_MODEL_IDS):
         assert isinstance(allow_model_ids, list), allow_model_ids
@@ -0,0 +1,81 @@
+import json
+from typing import Any, Iterable, Iterator, Sequence
+
+_NO_LINES = ()
+
+
+class StreamLineDecoder:
+    """Incremental splitter of a byte stream into newline terminated lines.
+
+    Only the pieces of the unfinished last line are kept. A part containing
+    newlines is split in one ``bytes.split`` call and the completed lines
+    are handed out right away, so memory stays bounded by the longest line
+    and every byte is scanned once, however long the generation is.
+    """
+
+    __slots__ = ("_pending",)
+
+    def __init__(self):
+        self._pending = []
+
+    def feed(self, data: bytes) -> Sequence[bytes]:
+        """Add bytes to the stream.
+
+        Args:
+            data: the next part of the stream
+
+        Returns:
+            the lines completed by ``data``, without their newline
+        """
+        if b"\n" not in data:
+            if data:
+                self._pending.append(data)
+            return _NO_LINES
+        lines = data.split(b"\n")
+        if self._pending:
+            self._pending.append(lines[0])
+            lines[0] = b"".join(self._pending)
+            self._pending.clear()
+        tail = lines.pop()
+        if tail:
+            self._pending.append(tail)
+        return lines
+
+    def flush(self) -> Sequence[bytes]:
+        """Return the unterminated last line of a finished stream, if any."""
+        if not self._pending:
+            return _NO_LINES
+        tail = b"".join(self._pending)
+        self._pending.clear()
+        return [tail]
+
+
+def iter_event_stream_lines(event_stream: Iterable[dict]) -> Iterator[bytes]:
+    """Yield the lines of the ``PayloadPart`` events of a SageMaker stream.
+
+    Events of other types are skipped.
+    """
+    decoder = StreamLineDecoder()
+    feed = decoder.feed
+    for event in event_stream:
+        part = event.get("PayloadPart")
+        if part is not None:
+            yield from feed(part["Bytes"])
+    yield from decoder.flush()
+
+
+def iter_event_stream_json(event_stream: Iterable[dict]) -> Iterator[Any]:
+    """Yield the JSON object of every non-empty line of a SageMaker stream.
+
+    Each line is decoded as soon as it is complete. Server-sent event lines
+    (``data: {...}``) are accepted as well, ``[DONE]`` markers are skipped.
+    """
+    loads = json.loads
+    for line in iter_event_stream_lines(event_stream):
+        if line[:5] == b"data:":
+            line = line[5:].strip()
+            if not line or line == b"[DONE]":
+                continue
+        elif not line or line.isspace():
+            continue
+        yield loads(line)
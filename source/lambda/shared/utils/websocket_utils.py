@@ -1,6 +1,8 @@
 import json
 import os
+import threading
 import time
+from typing import Callable
 
 import boto3
 from langchain_core.documents import Document
@@ -11,6 +13,11 @@ logger = get_logger("websocket_utils")
 
 ws_client = None
 stop_signals_table_name = os.environ.get("STOP_SIGNALS_TABLE_NAME", "")
+stop_signal_poll_interval = float(
+    os.environ.get("STOP_SIGNAL_POLL_INTERVAL", 0.5)
+)
+stream_flush_interval = float(os.environ.get("STREAM_FLUSH_INTERVAL", 0.1))
+stream_flush_bytes = int(os.environ.get("STREAM_FLUSH_BYTES", 2048))
 
 
 class JSONEncoder(json.JSONEncoder):
@@ -63,6 +70,8 @@ class StopSignalManager:
     def __init__(self):
         self.dynamodb = boto3.resource("dynamodb")
         self.table = self.dynamodb.Table(stop_signals_table_name)
+        # low level clients are thread safe, the poller checks from a thread
+        self.client = boto3.client("dynamodb")
 
     def set_stop_signal(self, connection_id: str) -> None:
         """Set stop signal in DynamoDB"""
@@ -81,8 +90,9 @@ class StopSignalManager:
     def check_stop_signal(self, connection_id: str) -> bool:
         """Check for stop signal in DynamoDB"""
         try:
-            response = self.table.get_item(
-                Key={"wsConnectionId": connection_id}
+            response = self.client.get_item(
+                TableName=stop_signals_table_name,
+                Key={"wsConnectionId": {"S": connection_id}},
             )
             return "Item" in response
         except Exception as e:
@@ -111,3 +121,129 @@ def check_stop_signal(connection_id: str) -> bool:
 
 def clear_stop_signal(connection_id: str) -> None:
     stop_signal_manager.clear_stop_signal(connection_id)
+
+
+class StopSignalPoller:
+    """Check the stop signal of a connection in a background thread.
+
+    The stream loop only reads a flag, so DynamoDB is queried once per
+    ``interval`` seconds instead of once per chunk.
+    """
+
+    def __init__(
+        self, connection_id: str, interval: float = stop_signal_poll_interval
+    ):
+        self.connection_id = connection_id
+        self.interval = interval
+        self._stop_signal = threading.Event()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def _poll(self):
+        while not self._closed.is_set():
+            if check_stop_signal(self.connection_id):
+                self._stop_signal.set()
+                return
+            self._closed.wait(self.interval)
+
+    def start(self) -> "StopSignalPoller":
+        self._thread.start()
+        return self
+
+    def is_stopped(self) -> bool:
+        return self._stop_signal.is_set()
+
+    def close(self):
+        self._closed.set()
+
+
+class StreamChunkSender:
+    """Coalesce stream chunks into fewer websocket frames.
+
+    The first chunk is sent right away to keep first token latency. Later
+    chunks are buffered and sent together once ``flush_interval`` seconds
+    have passed since the last frame or ``flush_bytes`` bytes are buffered.
+    Once started, a background thread sends buffered chunks when the
+    interval elapses, so they are not held back while the model pauses
+    between chunks. Frames are numbered consecutively from 0, so the
+    chunk_id order seen by the client is unchanged.
+
+    Args:
+        send_fn (Callable[[str, int], None]): sends one frame, given its
+            content and chunk_id
+    """
+
+    def __init__(
+        self,
+        send_fn: Callable[[str, int], None],
+        flush_interval: float = stream_flush_interval,
+        flush_bytes: int = stream_flush_bytes,
+    ):
+        self.send_fn = send_fn
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.chunk_id = 0
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._last_flush_time = None
+        # guards the buffer and keeps the frames in order
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._flush_pending, daemon=True)
+
+    def _flush_pending(self):
+        with self._condition:
+            while not self._closed:
+                if not self._buffer:
+                    self._condition.wait()
+                    continue
+                remaining = (
+                    self._last_flush_time + self.flush_interval - time.time()
+                )
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                try:
+                    self._flush()
+                except Exception as e:
+                    logger.error(f"Failed to send buffered stream chunks: {e}")
+                    return
+
+    def start(self) -> "StreamChunkSender":
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Stop the background thread, call flush to send what is left"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def add(self, chunk: str):
+        if not chunk:
+            return
+        with self._condition:
+            self._buffer.append(chunk)
+            self._buffer_bytes += len(chunk.encode("utf-8"))
+            if (
+                self._last_flush_time is None
+                or self._buffer_bytes >= self.flush_bytes
+                or time.time() - self._last_flush_time >= self.flush_interval
+            ):
+                self._flush()
+            else:
+                self._condition.notify()
+
+    def flush(self):
+        with self._condition:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        content = "".join(self._buffer)
+        self._buffer = []
+        self._buffer_bytes = 0
+        self.send_fn(content, self.chunk_id)
+        self.chunk_id += 1
+        self._last_flush_time = time.time()
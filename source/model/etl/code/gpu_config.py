@@ -1,4 +1,7 @@
+import os
+
 import GPUtil
+import onnxruntime
 
 def get_provider_config():
     if len(GPUtil.getGPUs()):
@@ -7,7 +10,26 @@ def get_provider_config():
         layout_model = 'layout.onnx'
     else:
         provider = ["CPUExecutionProvider"]
-        rec_batch_num = 1
+        # text lines are sorted by aspect ratio across pages before batching,
+        # so larger batches add little padding
+        rec_batch_num = 8
         layout_model = 'layout_s.onnx'
+    rec_batch_num = int(os.environ.get("REC_BATCH_NUM", rec_batch_num))
     
-    return provider, rec_batch_num, layout_model 
\ No newline at end of file
+    return provider, rec_batch_num, layout_model
+
+
+def get_session_options():
+    """Session options shared by the OCR and layout ONNX sessions.
+
+    Thread counts of 0 keep the onnxruntime default (one thread per
+    physical core).
+    """
+    sess_options = onnxruntime.SessionOptions()
+    sess_options.intra_op_num_threads = int(os.environ.get("ORT_INTRA_OP_NUM_THREADS", 0))
+    sess_options.inter_op_num_threads = int(os.environ.get("ORT_INTER_OP_NUM_THREADS", 0))
+    # the arena keeps the peak memory of every input shape seen, pages and
+    # text lines vary in size so it can be turned off to bound the RSS
+    sess_options.enable_cpu_mem_arena = os.environ.get("ORT_ENABLE_CPU_MEM_ARENA", "true").lower() == "true"
+    sess_options.enable_mem_pattern = os.environ.get("ORT_ENABLE_MEM_PATTERN", "true").lower() == "true"
+    return sess_options
@@ -1,22 +1,26 @@
 import datetime
 import io
 import logging
+import multiprocessing
 import os
 import re
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
 from pathlib import Path
 
 import boto3
 import cv2
 import numpy as np
 from figure_llm import figureUnderstand
+from gpu_config import get_provider_config
 from layout import LayoutPredictor
 from markdownify import markdownify as md
-from ocr import TextSystem
+from ocr import RecognitionQueue, TextSystem, sorted_boxes
 from PIL import Image
 from table import TableSystem
-from utils import check_and_read
+from utils import check_and_read, get_page_count, read_page
 from xycut import recursive_xy_cut
 
 logging.basicConfig(level=logging.INFO)
@@ -25,10 +29,85 @@ logger = logging.getLogger(__name__)
 MIN_TEXT_COUNT = 2  # 最小文本行数量阈值
 MAX_SCALE = 4.0  # 最大放大倍数
 MAX_PIXELS = 2000 * 3000  # 最大像素数
+# region: 每个版面区域单独运行完整的检测和识别
+# page: 每页只做一次文本检测, 所有区域的文本行一起识别. 结果与 region 不完全相同:
+#   跨越区域边界的文本行只归入中心所在的区域, 中心不在任何区域内的文本行被丢弃,
+#   切换前先用 test/structure_benchmark.py 比较两种模式的文本和速度
+STRUCTURE_OCR_MODE = os.environ.get("STRUCTURE_OCR_MODE", "region")
+# multi: 在 1, 0.66, 0.33 三个尺度上分别检测文本行来估计缩放比例
+# sample: 只在 AUTO_DPI_SAMPLE_SCALE 上检测一次,
+#   切换前先用 test/auto_dpi_benchmark.py 比较两种模式的文本和速度
+AUTO_DPI_MODE = os.environ.get("AUTO_DPI_MODE", "multi")
+AUTO_DPI_SAMPLE_SCALE = float(os.environ.get("AUTO_DPI_SAMPLE_SCALE", 0.66))
+# 文本行识别跨页批处理的页数
+STRUCTURE_PAGE_BATCH_SIZE = int(os.environ.get("STRUCTURE_PAGE_BATCH_SIZE", 8))
+# 并行分析页面的进程数, GPU 上默认为 1 (当前进程内处理), CPU 上默认为核数
+STRUCTURE_WORKERS = int(os.environ.get("STRUCTURE_WORKERS", 0)) or (
+    1
+    if any("CUDAExecutionProvider" in str(p) for p in get_provider_config()[0])
+    else os.cpu_count() or 1
+)
+
+# remove style char,
+# when using the recognition model trained on the PubtabNet dataset,
+# it will recognize the text format in the table, such as <b>
+STYLE_TOKENS = [
+    "<strike>",
+    "<strike>",
+    "<sup>",
+    "</sub>",
+    "<b>",
+    "</b>",
+    "<sub>",
+    "</sup>",
+    "<overline>",
+    "</overline>",
+    "<underline>",
+    "</underline>",
+    "<i>",
+    "</i>",
+]
+
+
+def assign_boxes_to_regions(dt_boxes, region_bboxes):
+    """
+    Split the text boxes detected on a page between layout regions.
+
+    A box belongs to every region containing its center. It is clipped to
+    the region, as the region mode only sees the pixels of the region, and
+    dropped when the clipping leaves it too small, as TextDetector does.
+
+    Args:
+        dt_boxes (np.ndarray): text boxes of the page with shape [N, 4, 2]
+        region_bboxes (list): [x1, y1, x2, y2] of the regions
+
+    Returns:
+        list: text boxes of every region, in the order of region_bboxes
+    """
+    dt_boxes = np.asarray(dt_boxes, dtype=np.float32).reshape(-1, 4, 2)
+    centers = dt_boxes.mean(axis=1)
+    region_boxes = []
+    for x1, y1, x2, y2 in region_bboxes:
+        inside = (
+            (centers[:, 0] >= x1)
+            & (centers[:, 0] < x2)
+            & (centers[:, 1] >= y1)
+            & (centers[:, 1] < y2)
+        )
+        boxes = dt_boxes[inside]
+        boxes[:, :, 0] = np.clip(boxes[:, :, 0], x1, max(x2 - 1, x1))
+        boxes[:, :, 1] = np.clip(boxes[:, :, 1], y1, max(y2 - 1, y1))
+        width = np.linalg.norm(boxes[:, 0] - boxes[:, 1], axis=1).astype(int)
+        height = np.linalg.norm(boxes[:, 0] - boxes[:, 3], axis=1).astype(int)
+        region_boxes.append(boxes[(width > 3) & (height > 3)])
+    return region_boxes
+
 
 class StructureSystem(object):
-    def __init__(self):
+    def __init__(self, ocr_mode=STRUCTURE_OCR_MODE, auto_dpi_mode=AUTO_DPI_MODE):
         self.mode = "structure"
+        self.ocr_mode = ocr_mode
+        self.auto_dpi_mode = auto_dpi_mode
         self.recovery = True
         drop_score = 0
         # init model
@@ -41,6 +120,81 @@ class StructureSystem(object):
     def __call__(
         self, img, return_ocr_result_in_table=False, lang="ch", auto_dpi=False
     ):
+        return self.predict_pages(
+            [img], return_ocr_result_in_table, lang, auto_dpi
+        )[0]
+
+    def predict_pages(
+        self, imgs, return_ocr_result_in_table=False, lang="ch", auto_dpi=False
+    ):
+        """
+        Analyze a batch of pages.
+
+        In page mode the text lines of all pages go through one recognition
+        queue, so the recognizer runs full batches of lines with similar
+        aspect ratios across regions and pages.
+
+        Returns:
+            list: (res_list, time_dict) of every page
+        """
+        if lang == "zh":
+            lang = "ch"
+        rec_queue = RecognitionQueue(self.text_system.text_recognizer[lang])
+        pages = [
+            self.analyze_page(
+                img,
+                page_idx,
+                rec_queue,
+                return_ocr_result_in_table,
+                lang,
+                auto_dpi,
+            )
+            for page_idx, img in enumerate(imgs)
+        ]
+
+        line_count = len(rec_queue)
+        start = time.time()
+        rec_queue_res = rec_queue.run()
+        rec_time = time.time() - start
+        results = []
+        for page_idx, (res_list, time_dict, pending) in enumerate(pages):
+            page_line_count = 0
+            for region_idx, (boxes, offset) in pending.items():
+                rec_res = rec_queue_res[(page_idx, region_idx)]
+                page_line_count += len(rec_res)
+                filter_boxes, filter_rec_res = self.text_system.filter_rec_res(
+                    boxes, rec_res
+                )
+                if self.recovery:
+                    # page coordinates, move them into the crop the region
+                    # mode runs on
+                    filter_boxes = [box - offset for box in filter_boxes]
+                res_list[region_idx]["res"] = self.format_text_res(
+                    filter_boxes, filter_rec_res
+                )
+            if line_count:
+                page_rec_time = rec_time * page_line_count / line_count
+                time_dict["rec"] += page_rec_time
+                time_dict["all"] += page_rec_time
+            results.append((res_list, time_dict))
+        return results
+
+    def analyze_page(
+        self,
+        img,
+        page_idx,
+        rec_queue,
+        return_ocr_result_in_table=False,
+        lang="ch",
+        auto_dpi=False,
+    ):
+        """
+        Run everything but the queued text recognition on one page.
+
+        Returns:
+            tuple: res_list, time_dict and the regions waiting for the
+                recognition queue, region index -> (boxes, crop offset)
+        """
         time_dict = {
             "image_orientation": 0,
             "layout": 0,
@@ -51,65 +205,48 @@ class StructureSystem(object):
             "kie": 0,
             "all": 0,
         }
-        if lang == "zh":
-            lang = "ch"
         start = time.time()
-        ori_im_shape = img.shape
-        ori_im_dtype = img.dtype
         layout_res, elapse = self.layout_predictor(img)
         final_s = None
         if auto_dpi:
-            final_s = 0
-            height_limit = 18 if lang == "ch" else 15
-            original_h, original_w = img.shape[:2]
-
-            for scale_base in [1, 0.66, 0.33]:
-                img_cur_scale = cv2.resize(
-                    img, (None, None), fx=scale_base, fy=scale_base
-                )
-                temp_result = self.text_system.text_detector[lang](
-                    img_cur_scale, scale=1
-                )
-                # 确保有足够的文本行
-                if len(temp_result) < MIN_TEXT_COUNT:
-                    continue
-                    
-                height_list = [
-                    max(text_line[:, 1]) - min(text_line[:, 1])
-                    for text_line in temp_result
-                ]
-                height_list.sort()
-                # 使用95%分位数而不是中位数
-                percentile_95_idx = int(len(height_list) * 0.05)
-                min_text_line_h = max(
-                    height_list[percentile_95_idx],  # 取文本行高度的一半作为下限，避免异常值影响
-                    height_limit / MAX_SCALE  # 限制最大缩放比例
-                )
-                # 计算初始缩放比例
-                scale = min((height_limit / min_text_line_h) * scale_base, MAX_SCALE)
-                
-                # 检查放大后的总像素数是否超过限制
-                scaled_pixels = int(original_h * scale) * int(original_w * scale)
-                if scaled_pixels > MAX_PIXELS:
-                    # 如果超过限制，调整缩放比例
-                    max_allowed_scale = np.sqrt(MAX_PIXELS / (original_h * original_w))
-                    scale = min(scale, max_allowed_scale)
-                
-                if scale > final_s:
-                    final_s = scale
+            final_s = self.detect_scale(img, lang)
 
         time_dict["layout"] += elapse
-        res_list = []
+        h, w = img.shape[:2]
+        region_bboxes = []
         for region in layout_res:
-            res = ""
             if region["bbox"] is not None:
                 x1, y1, x2, y2 = region["bbox"]
                 x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
                 x1, y1, x2, y2 = max(x1, 0), max(y1, 0), max(x2, 0), max(y2, 0)
-                roi_img = img[y1:y2, x1:x2, :]
             else:
                 x1, y1, x2, y2 = 0, 0, w, h
-                roi_img = img
+            region_bboxes.append([x1, y1, x2, y2])
+
+        page_boxes = {}
+        if self.ocr_mode == "page":
+            page_boxes = self.page_text_detect(
+                img,
+                {
+                    idx: bbox
+                    for idx, (region, bbox) in enumerate(
+                        zip(layout_res, region_bboxes)
+                    )
+                    if region["label"] != "table"
+                },
+                lang,
+                final_s,
+                time_dict,
+                page_idx,
+                rec_queue,
+            )
+
+        res_list = []
+        pending = {}
+        for idx, region in enumerate(layout_res):
+            res = ""
+            x1, y1, x2, y2 = region_bboxes[idx]
+            roi_img = img[y1:y2, x1:x2, :]
             if region["label"] == "table":
                 res, table_time_dict = self.table_system(
                     roi_img, return_ocr_result_in_table, lang
@@ -119,52 +256,21 @@ class StructureSystem(object):
                 time_dict["det"] += table_time_dict["det"]
                 time_dict["rec"] += table_time_dict["rec"]
             else:
-                wht_im = np.ones(ori_im_shape, dtype=ori_im_dtype)
-                wht_im[y1:y2, x1:x2, :] = roi_img
                 top = min(y2 - y1, y1)
                 left = min(x2 - x1, x1)
-                cur_wht_im = wht_im[
-                    y1 - top : min(y2 + (y2 - y1), wht_im.shape[0]),
-                    x1 - left : min(x2 + (x2 - x1), wht_im.shape[1]),
-                ]
-                filter_boxes, filter_rec_res = self.text_system(
-                    cur_wht_im, lang, final_s
-                )
-
-                # remove style char,
-                # when using the recognition model trained on the PubtabNet dataset,
-                # it will recognize the text format in the table, such as <b>
-                style_token = [
-                    "<strike>",
-                    "<strike>",
-                    "<sup>",
-                    "</sub>",
-                    "<b>",
-                    "</b>",
-                    "<sub>",
-                    "</sup>",
-                    "<overline>",
-                    "</overline>",
-                    "<underline>",
-                    "</underline>",
-                    "<i>",
-                    "</i>",
-                ]
-                res = []
-                for box, rec_res in zip(filter_boxes, filter_rec_res):
-                    rec_str, rec_conf = rec_res
-                    for token in style_token:
-                        if token in rec_str:
-                            rec_str = rec_str.replace(token, "")
-                    if not self.recovery:
-                        box += [x1 + left, y1 + top]
-                    res.append(
-                        {
-                            "text": rec_str,
-                            "confidence": float(rec_conf),
-                            "text_region": box.tolist(),
-                        }
+                if idx in page_boxes:
+                    # filled in once the recognition queue has run
+                    res = []
+                    pending[idx] = (page_boxes[idx], [x1 - left, y1 - top])
+                else:
+                    filter_boxes, filter_rec_res = self.region_text_system(
+                        img, [x1, y1, x2, y2], lang, final_s
                     )
+                    if not self.recovery:
+                        filter_boxes = [
+                            box + [x1 - left, y1 - top] for box in filter_boxes
+                        ]
+                    res = self.format_text_res(filter_boxes, filter_rec_res)
             res_list.append(
                 {
                     "type": region["label"].lower(),
@@ -175,11 +281,303 @@ class StructureSystem(object):
             )
         end = time.time()
         time_dict["all"] = end - start
-        return res_list, time_dict
+        return res_list, time_dict, pending
+
+    def detect_scale(self, img, lang):
+        """
+        Estimate the detection scale from the text line heights (auto dpi).
+
+        The multi mode detects text lines on the page resized to 1, 0.66
+        and 0.33 and keeps the largest scale. The sample mode detects them
+        once at AUTO_DPI_SAMPLE_SCALE.
+
+        Returns:
+            float: the scale, 0 when too few text lines were found
+        """
+        text_detector = self.text_system.text_detector[lang]
+        if self.auto_dpi_mode == "multi":
+            final_s = 0
+            for scale_base in [1, 0.66, 0.33]:
+                img_cur_scale = cv2.resize(
+                    img, (None, None), fx=scale_base, fy=scale_base
+                )
+                temp_result = text_detector(img_cur_scale, scale=1)
+                height_list = [
+                    max(text_line[:, 1]) - min(text_line[:, 1])
+                    for text_line in temp_result
+                ]
+                scale = self.text_line_scale(
+                    height_list, scale_base, img.shape, lang
+                )
+                if scale > final_s:
+                    final_s = scale
+            return final_s
+
+        sample_scale = AUTO_DPI_SAMPLE_SCALE
+        dt_boxes = text_detector(img, scale=sample_scale)
+        # the boxes are in page coordinates, measure them at the sample scale
+        height_list = [
+            (max(text_line[:, 1]) - min(text_line[:, 1])) * sample_scale
+            for text_line in dt_boxes
+        ]
+        return self.text_line_scale(height_list, sample_scale, img.shape, lang)
+
+    @staticmethod
+    def text_line_scale(height_list, scale_base, shape, lang):
+        """
+        Scale which brings the small text lines to the recognizer height.
+
+        Args:
+            height_list (list): text line heights on the page resized to
+                scale_base
+            scale_base (float): scale of the detection
+            shape (tuple): shape of the page
+            lang (str): language of the OCR models
+
+        Returns:
+            float: the scale, 0 when there are too few text lines
+        """
+        # 确保有足够的文本行
+        if len(height_list) < MIN_TEXT_COUNT:
+            return 0
+        height_limit = 18 if lang == "ch" else 15
+        original_h, original_w = shape[:2]
+        height_list = sorted(height_list)
+        # 使用95%分位数而不是中位数
+        percentile_95_idx = int(len(height_list) * 0.05)
+        min_text_line_h = max(
+            height_list[percentile_95_idx],  # 取文本行高度的一半作为下限，避免异常值影响
+            height_limit / MAX_SCALE  # 限制最大缩放比例
+        )
+        # 计算初始缩放比例
+        scale = min((height_limit / min_text_line_h) * scale_base, MAX_SCALE)
+
+        # 检查放大后的总像素数是否超过限制
+        scaled_pixels = int(original_h * scale) * int(original_w * scale)
+        if scaled_pixels > MAX_PIXELS:
+            # 如果超过限制，调整缩放比例
+            max_allowed_scale = np.sqrt(MAX_PIXELS / (original_h * original_w))
+            scale = min(scale, max_allowed_scale)
+        return scale
+
+    @staticmethod
+    def format_text_res(filter_boxes, filter_rec_res):
+        res = []
+        for box, rec_res in zip(filter_boxes, filter_rec_res):
+            rec_str, rec_conf = rec_res
+            for token in STYLE_TOKENS:
+                if token in rec_str:
+                    rec_str = rec_str.replace(token, "")
+            res.append(
+                {
+                    "text": rec_str,
+                    "confidence": float(rec_conf),
+                    "text_region": box.tolist(),
+                }
+            )
+        return res
+
+    def region_text_system(self, img, bbox, lang, scale):
+        """
+        Run text detection and recognition on one layout region.
+
+        The region is pasted on a blank page and cropped with a margin of
+        the region size around it.
+        """
+        x1, y1, x2, y2 = bbox
+        wht_im = np.ones(img.shape, dtype=img.dtype)
+        wht_im[y1:y2, x1:x2, :] = img[y1:y2, x1:x2, :]
+        top = min(y2 - y1, y1)
+        left = min(x2 - x1, x1)
+        cur_wht_im = wht_im[
+            y1 - top : min(y2 + (y2 - y1), wht_im.shape[0]),
+            x1 - left : min(x2 + (x2 - x1), wht_im.shape[1]),
+        ]
+        filter_boxes, filter_rec_res = self.text_system(cur_wht_im, lang, scale)
+        if filter_boxes is None:
+            return [], []
+        return filter_boxes, filter_rec_res
+
+    def page_text_detect(
+        self, img, region_bboxes, lang, scale, time_dict, page_idx, rec_queue
+    ):
+        """
+        Run text detection once on the page and queue the text lines of all
+        regions for recognition.
+
+        Args:
+            img (np.ndarray): the page
+            region_bboxes (dict): region index -> [x1, y1, x2, y2]
+            lang (str): language of the OCR models
+            scale (float): detection scale of auto dpi, None or 0 for the
+                original page size
+            time_dict (dict): det timing is added to it
+            page_idx (int): index of the page in the recognition queue
+            rec_queue (RecognitionQueue): queue of the text line crops
+
+        Returns:
+            dict: region index -> text boxes in page coordinates, queued
+                under (page_idx, region index)
+        """
+        if not region_bboxes:
+            return {}
+        text_system = self.text_system
+        # detect on the page at its rendered resolution instead of the 1280
+        # side limit of TextDetector, which would shrink the small text of a
+        # whole page; the region mode only hits that limit for crops (region
+        # plus margin) wider than 1280, so the detected boxes may differ
+        start = time.time()
+        dt_boxes = text_system.text_detector[lang](img, scale or 1)
+        time_dict["det"] += time.time() - start
+        if dt_boxes is None:
+            dt_boxes = []
+        indexes = list(region_bboxes.keys())
+        page_boxes = {}
+        for idx, boxes in zip(
+            indexes,
+            assign_boxes_to_regions(
+                dt_boxes, [region_bboxes[idx] for idx in indexes]
+            ),
+        ):
+            boxes = sorted_boxes(boxes)
+            rec_queue.put(
+                (page_idx, idx), text_system.crop_text_boxes(img, boxes)
+            )
+            page_boxes[idx] = boxes
+        return page_boxes
 
 
-structure_engine = StructureSystem()
 s3 = boto3.client("s3")
+# 在首次使用时创建, 多进程时只在工作进程中加载模型
+structure_engine = None
+structure_pool = None
+
+
+def get_structure_engine():
+    global structure_engine
+    if structure_engine is None:
+        structure_engine = StructureSystem()
+    return structure_engine
+
+
+def pack_page_result(result):
+    """
+    Sort the regions of a page in reading order and release their images.
+
+    Only figure regions keep their image, encoded as PNG, the other regions
+    drop their view of the page so the page array can be freed as soon as
+    the page is analyzed.
+
+    Args:
+        result (list): regions returned by StructureSystem for one page
+
+    Returns:
+        list: the regions in reading order
+    """
+    if result == []:
+        return []
+    boxes = [row["bbox"] for row in result]
+    res = []
+    recursive_xy_cut(np.asarray(boxes).astype(int), np.arange(len(boxes)), res)
+    result_sorted = [result[idx] for idx in res]
+    for region in result_sorted:
+        if region["type"].lower() == "figure" and region["img"].size > 0:
+            region["img"] = cv2.imencode(".png", region["img"])[1].tobytes()
+        else:
+            region["img"] = None
+    return result_sorted
+
+
+def region_image(region):
+    """Decode the PNG image of a packed figure region to an RGB image."""
+    return Image.open(io.BytesIO(region["img"])).convert("RGB")
+
+
+def init_structure_worker(threads):
+    # ONNX Runtime sessions are not fork-safe, the parent never builds an
+    # engine, every worker builds its own and shares the cores with the
+    # other workers
+    os.environ.setdefault("ORT_INTRA_OP_NUM_THREADS", str(threads))
+    get_structure_engine()
+
+
+def analyze_pages(task):
+    file_path, page_indexes, lang, auto_dpi = task
+    pages = [read_page(file_path, page_idx) for page_idx in page_indexes]
+    results = get_structure_engine().predict_pages(
+        pages, lang=lang, auto_dpi=auto_dpi
+    )
+    return [pack_page_result(result) for result, _ in results]
+
+
+def get_structure_pool():
+    """
+    Start the page worker pool on first use, it is kept for later requests.
+
+    The fork start method is used as spawn would import sm_predictor again,
+    which starts the server.
+    """
+    global structure_pool
+    if structure_pool is None:
+        threads = max(1, (os.cpu_count() or 1) // STRUCTURE_WORKERS)
+        structure_pool = ProcessPoolExecutor(
+            max_workers=STRUCTURE_WORKERS,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=init_structure_worker,
+            initargs=(threads,),
+        )
+    return structure_pool
+
+
+def iter_page_results(file_path, lang, auto_dpi):
+    """
+    Analyze the pages of the file and yield their packed regions in page order.
+
+    With several workers the pages are split into batches of up to
+    STRUCTURE_PAGE_BATCH_SIZE pages, small enough to keep every worker
+    busy. Each batch is rendered and analyzed in a worker process, its text
+    recognition is batched across its pages, and at most one batch of page
+    images per worker is in memory. Otherwise the pages are analyzed in
+    this process in batches of STRUCTURE_PAGE_BATCH_SIZE pages.
+    """
+    global structure_pool
+    if STRUCTURE_WORKERS > 1:
+        page_count = get_page_count(file_path)
+        batch_size = max(
+            1,
+            min(STRUCTURE_PAGE_BATCH_SIZE, -(-page_count // STRUCTURE_WORKERS)),
+        )
+        tasks = [
+            (
+                file_path,
+                list(range(idx, min(idx + batch_size, page_count))),
+                lang,
+                auto_dpi,
+            )
+            for idx in range(0, page_count, batch_size)
+        ]
+        try:
+            # map returns the batches in task order whatever order they
+            # finish in, and raises if a worker dies instead of waiting
+            for results in get_structure_pool().map(analyze_pages, tasks):
+                yield from results
+        except BrokenProcessPool:
+            # a worker died (e.g. killed for memory), start a new pool for
+            # the next request
+            structure_pool.shutdown(wait=False)
+            structure_pool = None
+            raise
+        return
+    engine = get_structure_engine()
+    pages = check_and_read(file_path)
+    while True:
+        page_batch = list(islice(pages, STRUCTURE_PAGE_BATCH_SIZE))
+        if not page_batch:
+            break
+        for result, _ in engine.predict_pages(
+            page_batch, lang=lang, auto_dpi=auto_dpi
+        ):
+            yield pack_page_result(result)
 
 
 def upload_images_to_s3(images, bucket: str, prefix: str, splitting_type: str):
@@ -259,16 +657,8 @@ def structure_predict(
     """
 
     all_res = []
-    for index, img in enumerate(check_and_read(file_path)):
-        result, _ = structure_engine(img, lang=lang, auto_dpi=auto_dpi)
-        if result != []:
-            boxes = [row["bbox"] for row in result]
-            res = []
-            recursive_xy_cut(
-                np.asarray(boxes).astype(int), np.arange(len(boxes)), res
-            )
-            result_sorted = [result[idx] for idx in res]
-            all_res += result_sorted
+    for result_sorted in iter_page_results(file_path, lang, auto_dpi):
+        all_res += result_sorted
     doc = ""
     prev_region_text = ""
     figure = {}
@@ -280,7 +670,7 @@ def structure_predict(
             if figure_rec:
                 doc += "<{{figure_" + str(len(figure)) + "}}>\n"
                 figure["<{{figure_" + str(len(figure)) + "}}>"] = [
-                    Image.fromarray(region["img"][:, :, ::-1]),
+                    region_image(region),
                     None,
                 ]
             else:
@@ -291,13 +681,13 @@ def structure_predict(
                     prev_region_text
                 ):
                     figure["<{{figure_" + str(len(figure)) + "}}>"] = [
-                        Image.fromarray(region["img"][:, :, ::-1]),
+                        region_image(region),
                         region_text,
                     ]
                     prev_region_text = region_text
                 else:
                     figure["<{{figure_" + str(len(figure)) + "}}>"] = [
-                        Image.fromarray(region["img"][:, :, ::-1]),
+                        region_image(region),
                         None,
                     ]
 
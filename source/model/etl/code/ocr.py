@@ -1,5 +1,7 @@
 import copy
+import logging
 import math
+import threading
 import time
 import os
 
@@ -9,11 +11,38 @@ from PIL import Image, ImageDraw
 import cv2
 from imaug import create_operators, transform
 from postprocess import build_post_process
-from gpu_config import get_provider_config
+from gpu_config import get_provider_config, get_session_options
 from model_config import MODEL_CONFIGS
 
+logger = logging.getLogger(__name__)
+
 provider, rec_batch_num, _ = get_provider_config()
 
+
+def parse_preload_langs(value):
+    """
+    Parse the comma separated OCR_PRELOAD_LANGS setting.
+
+    "zh", the language of the requests, is the "ch" models. Unknown
+    languages are logged and skipped, so a typo does not stop the container.
+    """
+    langs = []
+    for lang in value.split(","):
+        lang = lang.strip()
+        if lang == "zh":
+            lang = "ch"
+        if not lang or lang in langs:
+            continue
+        if lang not in MODEL_CONFIGS:
+            logger.warning(f"Unknown OCR_PRELOAD_LANGS language skipped: {lang}")
+            continue
+        langs.append(lang)
+    return langs
+
+
+# languages loaded when the container starts, the others on first use
+OCR_PRELOAD_LANGS = parse_preload_langs(os.environ.get("OCR_PRELOAD_LANGS", "ch"))
+
 class TextClassifier():
     def __init__(self):
         self.weights_path = os.path.join(os.environ['MODEL_PATH'], 'classifier.onnx')
@@ -28,7 +57,7 @@ class TextClassifier():
         }
         self.postprocess_op = build_post_process(postprocess_params)
 
-        self.ort_session = onnxruntime.InferenceSession(self.weights_path, providers=provider)
+        self.ort_session = onnxruntime.InferenceSession(self.weights_path, providers=provider, sess_options=get_session_options())
 
     def resize_norm_img(self, img):
         imgC, imgH, imgW = self.cls_image_shape
@@ -107,7 +136,7 @@ class TextDetector():
         self.preprocess_op = create_operators(pre_process_list)
         self.preprocess_op_identity = create_operators(pre_process_list_identity)
         self.postprocess_op = build_post_process(postprocess_params)
-        self.ort_session = onnxruntime.InferenceSession(self.weights_path, providers=provider)
+        self.ort_session = onnxruntime.InferenceSession(self.weights_path, providers=provider, sess_options=get_session_options())
         _ = self.ort_session.run(None, {"x": np.zeros([1, 3, 64, 64], dtype='float32')})
 
     # load_pytorch_weights
@@ -217,7 +246,7 @@ class TextRecognizer():
         self.use_zero_copy_run = False
 
         self.postprocess_op = build_post_process(postprocess_params)
-        self.ort_session = onnxruntime.InferenceSession(self.weights_path, providers=provider)
+        self.ort_session = onnxruntime.InferenceSession(self.weights_path, providers=provider, sess_options=get_session_options())
 
     def resize_norm_img(self, img, max_wh_ratio):
         imgC, imgH, imgW = self.rec_image_shape
@@ -283,6 +312,45 @@ class TextRecognizer():
             for rno in range(len(rec_result)):
                 rec_res[indices[beg_img_no + rno]] = rec_result[rno]
         return rec_res
+class RecognitionQueue():
+    """
+    Collects text line crops of many regions and pages for one recognizer.
+
+    TextRecognizer sorts its input by aspect ratio and runs it in batches of
+    rec_batch_num, so recognizing all queued crops in a single call gives
+    full batches of similar widths instead of a few small batches per
+    region. The results are scattered back by the key of each put.
+    """
+    def __init__(self, text_recognizer):
+        self.text_recognizer = text_recognizer
+        self.keys = []
+        self.counts = []
+        self.img_crop_list = []
+
+    def __len__(self):
+        return len(self.img_crop_list)
+
+    def put(self, key, img_crop_list):
+        self.keys.append(key)
+        self.counts.append(len(img_crop_list))
+        self.img_crop_list.extend(img_crop_list)
+
+    def run(self):
+        """
+        Recognize all queued crops and empty the queue.
+
+        Returns:
+            dict: key -> recognition results of the crops put under it
+        """
+        rec_res = self.text_recognizer(self.img_crop_list) if self.img_crop_list else []
+        results = {}
+        offset = 0
+        for key, count in zip(self.keys, self.counts):
+            results[key] = rec_res[offset:offset + count]
+            offset += count
+        self.keys, self.counts, self.img_crop_list = [], [], []
+        return results
+
 def sorted_boxes(dt_boxes):
     """
     Sort text boxes in order from top to bottom, left to right
@@ -303,19 +371,40 @@ def sorted_boxes(dt_boxes):
             _boxes[i] = _boxes[i + 1]
             _boxes[i + 1] = tmp
     return _boxes
+class LazyModelDict(dict):
+    """
+    Dict of per-language models, a model is created on its first lookup.
+    """
+    def __init__(self, factory, preload_langs=()):
+        super().__init__()
+        self.factory = factory
+        self._lock = threading.Lock()
+        for lang in preload_langs:
+            self[lang]
+
+    def __missing__(self, lang):
+        if lang not in MODEL_CONFIGS:
+            raise KeyError(lang)
+        with self._lock:
+            if not dict.__contains__(self, lang):
+                dict.__setitem__(self, lang, self.factory(lang))
+        return dict.__getitem__(self, lang)
+
+
 class TextSystem:
-    def __init__(self):
+    def __init__(self, preload_langs=OCR_PRELOAD_LANGS):
         #self.text_detector = TextDetector()
-        self.text_detector = {
-            'ch': TextDetector('ch'),
-            'en': TextDetector('en'),
-            'multi': TextDetector('multi'),
-        }
-        self.text_recognizer = {
-            'ch': TextRecognizer('ch'),
-            'en': TextRecognizer('en'),
-            'multi': TextRecognizer('multi'),
-        }
+        # languages with the same detection model share its session
+        detectors_by_model = {}
+
+        def create_text_detector(lang):
+            det_model = MODEL_CONFIGS[lang]['det']
+            if det_model not in detectors_by_model:
+                detectors_by_model[det_model] = TextDetector(lang)
+            return detectors_by_model[det_model]
+
+        self.text_detector = LazyModelDict(create_text_detector, preload_langs)
+        self.text_recognizer = LazyModelDict(TextRecognizer, preload_langs)
         
         self.drop_score = 0.4
         #self.text_classifier = TextClassifier()
@@ -364,6 +453,23 @@ class TextSystem:
             dst_img = np.rot90(dst_img)
         return dst_img
 
+    def crop_text_boxes(self, img, dt_boxes):
+        img_crop_list = []
+        for bno in range(len(dt_boxes)):
+            tmp_box = copy.deepcopy(dt_boxes[bno])
+            img_crop = self.get_rotate_crop_image(img, tmp_box)
+            img_crop_list.append(img_crop)
+        return img_crop_list
+
+    def filter_rec_res(self, dt_boxes, rec_res):
+        filter_boxes, filter_rec_res = [], []
+        for box, rec_reuslt in zip(dt_boxes, rec_res):
+            text, score = rec_reuslt
+            if score >= self.drop_score:
+                filter_boxes.append(box)
+                filter_rec_res.append(rec_reuslt)
+        return filter_boxes, filter_rec_res
+
     def __call__(self, img, lang='ch', scale=None):
         ori_im = img.copy()
         
@@ -371,21 +477,11 @@ class TextSystem:
         
         if dt_boxes is None:
             return None, None
-        img_crop_list = []
 
         dt_boxes = sorted_boxes(dt_boxes)
 
-        for bno in range(len(dt_boxes)):
-            tmp_box = copy.deepcopy(dt_boxes[bno])
-            img_crop = self.get_rotate_crop_image(ori_im, tmp_box)
-            img_crop_list.append(img_crop)
+        img_crop_list = self.crop_text_boxes(ori_im, dt_boxes)
         #img_crop_list, angle_list = self.text_classifier(img_crop_list)
 
         rec_res = self.text_recognizer[lang](img_crop_list)
-        filter_boxes, filter_rec_res = [], []
-        for box, rec_reuslt in zip(dt_boxes, rec_res):
-            text, score = rec_reuslt
-            if score >= self.drop_score:
-                filter_boxes.append(box)
-                filter_rec_res.append(rec_reuslt)
-        return filter_boxes, filter_rec_res
\ No newline at end of file
+        return self.filter_rec_res(dt_boxes, rec_res)
@@ -18,6 +18,8 @@ except ImportError:
 
 __all__ = [
     "check_and_read",
+    "get_page_count",
+    "read_page",
     "readimg",
     "lambda_return"
 ]
@@ -55,18 +57,9 @@ def check_and_read(img_path):
     # Handle PDF files
     elif ext == "pdf":
         import fitz
-        MAX_PIXELS = 6000000  # 最大像素数限制
         with fitz.open(img_path) as pdf:
             for pg in range(0, pdf.page_count):
-                page = pdf[pg]
-                rect = page.rect
-                w, h = rect.width, rect.height
-                scale = min(1.0, np.sqrt(MAX_PIXELS / (w * h * 9)))  # 9是因为原来的Matrix(3, 3)
-                mat = fitz.Matrix(3 * scale, 3 * scale)
-                pm = page.get_pixmap(matrix=mat, alpha=False)
-                img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
-                img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                yield img
+                yield render_pdf_page(pdf[pg])
     # Handle common image formats (JPG, PNG, etc.)
     else:
         img = cv2.imread(img_path)
@@ -76,6 +69,38 @@ def check_and_read(img_path):
             img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
         yield img[:, :, ::-1]
 
+def render_pdf_page(page):
+    """Render a PyMuPDF page to a BGR image of at most MAX_PIXELS pixels."""
+    import fitz
+    MAX_PIXELS = 6000000  # 最大像素数限制
+    rect = page.rect
+    w, h = rect.width, rect.height
+    scale = min(1.0, np.sqrt(MAX_PIXELS / (w * h * 9)))  # 9是因为原来的Matrix(3, 3)
+    mat = fitz.Matrix(3 * scale, 3 * scale)
+    pm = page.get_pixmap(matrix=mat, alpha=False)
+    img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
+    return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+
+def get_page_count(img_path):
+    """Number of pages check_and_read yields for the file."""
+    if os.path.basename(img_path)[-3:].lower() == "pdf":
+        import fitz
+        with fitz.open(img_path) as pdf:
+            return pdf.page_count
+    return 1
+
+def read_page(img_path, page_index):
+    """Read a single page of the file, as check_and_read would yield it.
+
+    PDF pages are rendered on their own, so worker processes can each
+    render the pages they analyze.
+    """
+    if os.path.basename(img_path)[-3:].lower() == "pdf":
+        import fitz
+        with fitz.open(img_path) as pdf:
+            return render_pdf_page(pdf[page_index])
+    return next(iter(check_and_read(img_path)))
+
 def readimg(body, keys=None):
     """Read images from various sources in a request body.
     
@@ -8,7 +8,7 @@ def projection_by_bboxes(boxes: np.array, axis: int) -> np.ndarray:
      通过一组 bbox 获得投影直方图，最后以 per-pixel 形式输出
 
     Args:
-        boxes: [N, 4]
+        boxes: [N, 4], 非负整数坐标
         axis: 0-x坐标向水平方向投影， 1-y坐标向垂直方向投影
 
     Returns:
@@ -17,11 +17,14 @@ def projection_by_bboxes(boxes: np.array, axis: int) -> np.ndarray:
     """
     assert axis in [0, 1]
     length = np.max(boxes[:, axis::2])
-    res = np.zeros(length, dtype=int)
-    # TODO: how to remove for loop?
-    for start, end in boxes[:, axis::2]:
-        res[start:end] += 1
-    return res
+    starts = boxes[:, axis]
+    ends = boxes[:, axis + 2]
+    # 差分数组: 每个 bbox 在 start 处 +1, 在 end 处 -1, 累加即为投影
+    valid = starts < ends
+    diff = np.bincount(starts[valid], minlength=length + 1) - np.bincount(
+        ends[valid], minlength=length + 1
+    )
+    return np.cumsum(diff[:length])
 
 
 # from: https://dothinking.github.io/2021-06-19-%E9%80%92%E5%BD%92%E6%8A%95%E5%BD%B1%E5%88%86%E5%89%B2%E7%AE%97%E6%B3%95/#:~:text=%E9%80%92%E5%BD%92%E6%8A%95%E5%BD%B1%E5%88%86%E5%89%B2%EF%BC%88Recursive%20XY,%EF%BC%8C%E5%8F%AF%E4%BB%A5%E5%88%92%E5%88%86%E6%AE%B5%E8%90%BD%E3%80%81%E8%A1%8C%E3%80%82
@@ -70,56 +73,66 @@ def split_projection_profile(arr_values: np.array, min_value: float, min_gap: fl
 
 def recursive_xy_cut(boxes: np.ndarray, indices: List[int], res: List[int]):
     """
+    按阅读顺序排列 bbox. 用栈代替递归, 输出顺序与递归切分相同
 
     Args:
         boxes: (N, 4)
-        indices: 递归过程中始终表示 box 在原始数据中的索引
+        indices: 始终表示 box 在原始数据中的索引
         res: 保存输出结果
 
     """
-    # 向 y 轴投影
     assert len(boxes) == len(indices)
-
-    _indices = boxes[:, 1].argsort()
-    y_sorted_boxes = boxes[_indices]
-    y_sorted_indices = indices[_indices]
-
-    # debug_vis(y_sorted_boxes, y_sorted_indices)
-
-    y_projection = projection_by_bboxes(boxes=y_sorted_boxes, axis=1)
-    pos_y = split_projection_profile(y_projection, 0, 1)
-    if not pos_y:
-        return
-
-    arr_y0, arr_y1 = pos_y
-    for r0, r1 in zip(arr_y0, arr_y1):
-        # [r0, r1] 表示按照水平切分，有 bbox 的区域，对这些区域会再进行垂直切分
-        _indices = (r0 <= y_sorted_boxes[:, 1]) & (y_sorted_boxes[:, 1] < r1)
-
-        y_sorted_boxes_chunk = y_sorted_boxes[_indices]
-        y_sorted_indices_chunk = y_sorted_indices[_indices]
-
-        _indices = y_sorted_boxes_chunk[:, 0].argsort()
-        x_sorted_boxes_chunk = y_sorted_boxes_chunk[_indices]
-        x_sorted_indices_chunk = y_sorted_indices_chunk[_indices]
-
-        # 往 x 方向投影
-        x_projection = projection_by_bboxes(boxes=x_sorted_boxes_chunk, axis=0)
-        pos_x = split_projection_profile(x_projection, 0, 1)
-        if not pos_x:
+    # 栈中的元素: (boxes, indices) 表示待切分的区域, (None, indices) 表示直接输出
+    stack = [(boxes, indices)]
+    while stack:
+        boxes, indices = stack.pop()
+        if boxes is None:
+            res.extend(indices)
             continue
 
-        arr_x0, arr_x1 = pos_x
-        if len(arr_x0) == 1:
-            # x 方向无法切分
-            res.extend(x_sorted_indices_chunk)
+        # 向 y 轴投影
+        _indices = boxes[:, 1].argsort()
+        y_sorted_boxes = boxes[_indices]
+        y_sorted_indices = indices[_indices]
+
+        y_projection = projection_by_bboxes(boxes=y_sorted_boxes, axis=1)
+        pos_y = split_projection_profile(y_projection, 0, 1)
+        if not pos_y:
             continue
 
-        # x 方向上能分开，继续递归调用
-        for c0, c1 in zip(arr_x0, arr_x1):
-            _indices = (c0 <= x_sorted_boxes_chunk[:, 0]) & (
-                x_sorted_boxes_chunk[:, 0] < c1
-            )
-            recursive_xy_cut(
-                x_sorted_boxes_chunk[_indices], x_sorted_indices_chunk[_indices], res
-            )
+        children = []
+        arr_y0, arr_y1 = pos_y
+        for r0, r1 in zip(arr_y0, arr_y1):
+            # [r0, r1] 表示按照水平切分，有 bbox 的区域，对这些区域会再进行垂直切分
+            _indices = (r0 <= y_sorted_boxes[:, 1]) & (y_sorted_boxes[:, 1] < r1)
+
+            y_sorted_boxes_chunk = y_sorted_boxes[_indices]
+            y_sorted_indices_chunk = y_sorted_indices[_indices]
+
+            _indices = y_sorted_boxes_chunk[:, 0].argsort()
+            x_sorted_boxes_chunk = y_sorted_boxes_chunk[_indices]
+            x_sorted_indices_chunk = y_sorted_indices_chunk[_indices]
+
+            # 往 x 方向投影
+            x_projection = projection_by_bboxes(boxes=x_sorted_boxes_chunk, axis=0)
+            pos_x = split_projection_profile(x_projection, 0, 1)
+            if not pos_x:
+                continue
+
+            arr_x0, arr_x1 = pos_x
+            if len(arr_x0) == 1:
+                # x 方向无法切分
+                children.append((None, x_sorted_indices_chunk))
+                continue
+
+            # x 方向上能分开，继续切分
+            for c0, c1 in zip(arr_x0, arr_x1):
+                _indices = (c0 <= x_sorted_boxes_chunk[:, 0]) & (
+                    x_sorted_boxes_chunk[:, 0] < c1
+                )
+                children.append(
+                    (x_sorted_boxes_chunk[_indices], x_sorted_indices_chunk[_indices])
+                )
+
+        # 逆序入栈, 先处理上方和左侧的区域
+        stack.extend(reversed(children))
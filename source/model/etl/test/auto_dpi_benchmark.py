@@ -0,0 +1,76 @@
+"""Benchmark the auto dpi modes of StructureSystem.
+
+Runs the multi (three detection passes at 1, 0.66 and 0.33) and the sample
+auto dpi mode on every page of a PDF or image and reports pages per second,
+the number of ONNX detection runs, the estimated scales and how close the
+recognized text of the two modes is. Needs the ETL models under MODEL_PATH.
+
+    MODEL_PATH=/opt/ml/model python auto_dpi_benchmark.py file.pdf [lang] [sample_scale]
+"""
+import difflib
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../code"))
+os.environ.setdefault("AWS_REGION", "us-east-1")
+if len(sys.argv) > 3:
+    os.environ["AUTO_DPI_SAMPLE_SCALE"] = sys.argv[3]
+
+from main import StructureSystem
+from structure_benchmark import count_detector_runs, page_text
+from utils import check_and_read
+
+
+def run(engine, pages, lang):
+    texts = []
+    scales = []
+    start = time.time()
+    for img in pages:
+        result, _ = engine(img, lang=lang, auto_dpi=True)
+        texts.append(page_text(result))
+    elapsed = time.time() - start
+    for img in pages:
+        scales.append(engine.detect_scale(img, lang))
+    return elapsed, texts, scales
+
+
+if __name__ == "__main__":
+    file_path = sys.argv[1]
+    lang = sys.argv[2] if len(sys.argv) > 2 else "ch"
+    pages = list(check_and_read(file_path))
+    engine = StructureSystem(auto_dpi_mode="multi")
+    counter = count_detector_runs(engine, lang)
+
+    multi_time, multi_texts, multi_scales = run(engine, pages, lang)
+    multi_runs = counter["runs"]
+    engine.auto_dpi_mode = "sample"
+    counter["runs"] = 0
+    sample_time, sample_texts, sample_scales = run(engine, pages, lang)
+    sample_runs = counter["runs"]
+    # run() estimates the scales once more after the pages
+    multi_runs -= 3 * len(pages)
+    sample_runs -= len(pages)
+
+    similarity = [
+        difflib.SequenceMatcher(None, a, b).ratio()
+        for a, b in zip(multi_texts, sample_texts)
+    ]
+    scale_error = [
+        abs(a - b) / a for a, b in zip(multi_scales, sample_scales) if a
+    ]
+    print(f"{len(pages)} pages, {engine.ocr_mode} ocr mode")
+    print(
+        f"multi:  {len(pages) / multi_time:6.2f} pages/s, "
+        f"{multi_runs} detection runs"
+    )
+    print(
+        f"sample: {len(pages) / sample_time:6.2f} pages/s, "
+        f"{sample_runs} detection runs ({multi_time / sample_time:.2f}x)"
+    )
+    if scale_error:
+        print(
+            f"scale error: max {max(scale_error):.3f}, "
+            f"mean {sum(scale_error) / len(scale_error):.3f}"
+        )
+    print(f"text similarity: min {min(similarity):.3f}, mean {sum(similarity) / len(similarity):.3f}")
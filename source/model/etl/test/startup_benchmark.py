@@ -0,0 +1,76 @@
+"""Report startup time and resident memory of the OCR engine per configuration.
+
+Every configuration is measured in a fresh process: the time to build
+TextSystem and LayoutPredictor, the RSS after building them and after
+running one page through each preloaded language. Needs the ETL models
+under MODEL_PATH.
+
+    MODEL_PATH=/opt/ml/model python startup_benchmark.py [image]
+"""
+import json
+import os
+import subprocess
+import sys
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../code")
+
+CONFIGURATIONS = [
+    {"OCR_PRELOAD_LANGS": "ch,en,multi"},
+    {"OCR_PRELOAD_LANGS": "ch"},
+    {"OCR_PRELOAD_LANGS": "en"},
+    {"OCR_PRELOAD_LANGS": ""},
+    {"OCR_PRELOAD_LANGS": "ch", "ORT_ENABLE_CPU_MEM_ARENA": "false"},
+    {"OCR_PRELOAD_LANGS": "ch", "ORT_INTRA_OP_NUM_THREADS": "2"},
+]
+
+MEASURE = """
+import json, sys, time
+import numpy as np
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+
+start = time.time()
+from layout import LayoutPredictor
+from ocr import OCR_PRELOAD_LANGS, TextSystem
+
+layout_predictor = LayoutPredictor()
+text_system = TextSystem()
+startup = time.time() - start
+startup_rss = rss_mb()
+
+if len(sys.argv) > 1:
+    from utils import check_and_read
+    img = next(iter(check_and_read(sys.argv[1])))
+else:
+    img = np.full((1200, 900, 3), 255, dtype=np.uint8)
+for lang in OCR_PRELOAD_LANGS or ["ch"]:
+    layout_predictor(img)
+    text_system(img, lang)
+print(json.dumps({"startup": startup, "startup_rss": startup_rss, "page_rss": rss_mb()}))
+"""
+
+
+if __name__ == "__main__":
+    print(f"{'configuration':60s} {'startup s':>10s} {'RSS MB':>8s} {'RSS after page MB':>18s}")
+    for config in CONFIGURATIONS:
+        env = {**os.environ, **config}
+        output = subprocess.run(
+            [sys.executable, "-c", MEASURE, *sys.argv[1:]],
+            cwd=CODE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        name = ", ".join(f"{k}={v}" for k, v in config.items())
+        print(
+            f"{name:60s} {result['startup']:10.2f} {result['startup_rss']:8.0f} "
+            f"{result['page_rss']:18.0f}"
+        )
@@ -0,0 +1,78 @@
+"""Benchmark the page and region OCR modes of StructureSystem.
+
+Runs both modes on every page of a PDF or image and reports pages per
+second, the number of ONNX detection runs and how close the recognized text
+of the two modes is. Needs the ETL models under MODEL_PATH.
+
+    MODEL_PATH=/opt/ml/model python structure_benchmark.py file.pdf [lang]
+"""
+import difflib
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../code"))
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+from main import StructureSystem
+from utils import check_and_read
+
+
+def page_text(result):
+    lines = []
+    for region in result:
+        if region["type"] == "table":
+            continue
+        lines += [line["text"] for line in region["res"]]
+    return "\n".join(lines)
+
+
+def count_detector_runs(engine, lang):
+    detector = engine.text_system.text_detector[lang]
+    detector_call = type(detector).__call__
+    counter = {"runs": 0}
+
+    def counted(self, *args, **kwargs):
+        counter["runs"] += 1
+        return detector_call(self, *args, **kwargs)
+
+    type(detector).__call__ = counted
+    return counter
+
+
+def run(engine, pages, lang):
+    texts = []
+    start = time.time()
+    for img in pages:
+        result, _ = engine(img, lang=lang, auto_dpi=True)
+        texts.append(page_text(result))
+    return time.time() - start, texts
+
+
+if __name__ == "__main__":
+    file_path = sys.argv[1]
+    lang = sys.argv[2] if len(sys.argv) > 2 else "ch"
+    pages = list(check_and_read(file_path))
+    engine = StructureSystem(ocr_mode="region")
+    counter = count_detector_runs(engine, lang)
+
+    region_time, region_texts = run(engine, pages, lang)
+    region_runs = counter["runs"]
+    engine.ocr_mode = "page"
+    page_time, page_texts = run(engine, pages, lang)
+    page_runs = counter["runs"] - region_runs
+
+    similarity = [
+        difflib.SequenceMatcher(None, a, b).ratio()
+        for a, b in zip(region_texts, page_texts)
+    ]
+    print(f"{len(pages)} pages")
+    print(
+        f"region mode: {len(pages) / region_time:6.2f} pages/s, "
+        f"{region_runs} detection runs"
+    )
+    print(
+        f"page mode:   {len(pages) / page_time:6.2f} pages/s, "
+        f"{page_runs} detection runs ({region_time / page_time:.1f}x)"
+    )
+    print(f"text similarity: min {min(similarity):.3f}, mean {sum(similarity) / len(similarity):.3f}")
@@ -0,0 +1,125 @@
+"""Check and benchmark the vectorized XY-cut reading order.
+
+Random pages (single and multi column layouts, overlapping, degenerate and
+touching boxes) are ordered by the former loop based projection with
+recursive cut and by xycut.recursive_xy_cut, the projections and orderings
+must be identical. Then dense pages with thousands of text boxes are timed.
+
+    python xycut_benchmark.py [cases] [boxes_per_page]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../code"))
+
+from xycut import projection_by_bboxes, recursive_xy_cut, split_projection_profile
+
+
+def legacy_projection_by_bboxes(boxes, axis):
+    length = np.max(boxes[:, axis::2])
+    res = np.zeros(length, dtype=int)
+    for start, end in boxes[:, axis::2]:
+        res[start:end] += 1
+    return res
+
+
+def legacy_recursive_xy_cut(boxes, indices, res):
+    _indices = boxes[:, 1].argsort()
+    y_sorted_boxes = boxes[_indices]
+    y_sorted_indices = indices[_indices]
+    y_projection = legacy_projection_by_bboxes(y_sorted_boxes, 1)
+    pos_y = split_projection_profile(y_projection, 0, 1)
+    if not pos_y:
+        return
+    arr_y0, arr_y1 = pos_y
+    for r0, r1 in zip(arr_y0, arr_y1):
+        _indices = (r0 <= y_sorted_boxes[:, 1]) & (y_sorted_boxes[:, 1] < r1)
+        y_sorted_boxes_chunk = y_sorted_boxes[_indices]
+        y_sorted_indices_chunk = y_sorted_indices[_indices]
+        _indices = y_sorted_boxes_chunk[:, 0].argsort()
+        x_sorted_boxes_chunk = y_sorted_boxes_chunk[_indices]
+        x_sorted_indices_chunk = y_sorted_indices_chunk[_indices]
+        x_projection = legacy_projection_by_bboxes(x_sorted_boxes_chunk, 0)
+        pos_x = split_projection_profile(x_projection, 0, 1)
+        if not pos_x:
+            continue
+        arr_x0, arr_x1 = pos_x
+        if len(arr_x0) == 1:
+            res.extend(x_sorted_indices_chunk)
+            continue
+        for c0, c1 in zip(arr_x0, arr_x1):
+            _indices = (c0 <= x_sorted_boxes_chunk[:, 0]) & (
+                x_sorted_boxes_chunk[:, 0] < c1
+            )
+            legacy_recursive_xy_cut(
+                x_sorted_boxes_chunk[_indices], x_sorted_indices_chunk[_indices], res
+            )
+
+
+def random_boxes(rng, count, width=2480, height=3508):
+    """Text lines in 1 to 4 columns with jitter, overlaps and empty boxes.
+
+    Coordinates are not negative, as main.py clamps the layout boxes.
+    """
+    columns = rng.randint(1, 4)
+    column_width = width // columns
+    line_height = rng.randint(4, 40)
+    boxes = []
+    for _ in range(count):
+        column = rng.randrange(columns)
+        x1 = column * column_width + rng.randint(0, column_width // 2)
+        y1 = max(rng.randrange(0, height, line_height) + rng.randint(-3, 3), 0)
+        x2 = x1 + rng.randint(0, column_width // 2)
+        y2 = y1 + rng.randint(0, line_height + 6)
+        boxes.append([x1, y1, x2, y2])
+    return np.asarray(boxes).astype(int)
+
+
+def order(cut, boxes):
+    res = []
+    cut(boxes, np.arange(len(boxes)), res)
+    return [int(idx) for idx in res]
+
+
+def check(cases, max_boxes):
+    rng = random.Random(0)
+    for case in range(cases):
+        boxes = random_boxes(rng, rng.randint(1, max_boxes))
+        for axis in [0, 1]:
+            assert np.array_equal(
+                projection_by_bboxes(boxes, axis),
+                legacy_projection_by_bboxes(boxes, axis),
+            ), f"projection differs, case {case}"
+        assert order(recursive_xy_cut, boxes) == order(
+            legacy_recursive_xy_cut, boxes
+        ), f"ordering differs, case {case}"
+    print(f"{cases} random pages: projections and orderings identical")
+
+
+def best_time(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    cases = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    boxes_per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+    check(cases, 200)
+
+    pages = [random_boxes(random.Random(seed), boxes_per_page) for seed in range(5)]
+    legacy_time = best_time(lambda: [order(legacy_recursive_xy_cut, b) for b in pages])
+    new_time = best_time(lambda: [order(recursive_xy_cut, b) for b in pages])
+    print(f"{len(pages)} pages of {boxes_per_page} boxes")
+    print(f"loop + recursion: {legacy_time / len(pages) * 1000:8.2f} ms/page")
+    print(
+        f"vectorized:       {new_time / len(pages) * 1000:8.2f} ms/page "
+        f"({legacy_time / new_time:.1f}x)"
+    )